@@ -0,0 +1,304 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from random import Random
+
+import django
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.feed import rebuild_feeds
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.popularity import refresh_popularity
+from recipes.seeding import Seeder
+from recipes.shopping_list import rebuild_shopping_lists
+from recipes.similarity import refresh_neighbours
+from users.models import Follow, User
+
+SCALES = {
+    'small': {
+        'users': 300, 'recipes': 1_000,
+        'favorites': 300, 'follows': 200, 'cart': 30,
+    },
+    'large': {
+        'users': 5_000, 'recipes': 100_000,
+        'favorites': 500, 'follows': 400, 'cart': 60,
+    },
+}
+BATCH_SIZE = 5_000
+TAGS_COUNT = 3
+INGREDIENTS_COUNT = 500
+BENCH_EMAIL = 'benchmark@foodgram.local'
+BENCH_PASSWORD = 'benchmark-password'
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+)
+
+
+def build_dataset(scale, seed=0):
+    params = SCALES[scale]
+    rng = Random(seed)
+    seeder = Seeder(seed=seed, batch_size=BATCH_SIZE, password=BENCH_PASSWORD)
+    tag_ids = seeder.ensure_tags(TAGS_COUNT)
+    ingredient_ids = seeder.ensure_ingredients(INGREDIENTS_COUNT)
+    user = User.objects.create_user(
+        email=BENCH_EMAIL, username='benchmark', password=BENCH_PASSWORD,
+        first_name='Bench', last_name='Mark'
+    )
+    user_ids = seeder.create_users(params['users'])
+    recipe_ids = seeder.create_recipes(
+        params['recipes'], user_ids, tag_ids, ingredient_ids
+    )
+    seeder.create_pairs(
+        Favorite, ('user_id', 'recipe_id'), user_ids, recipe_ids,
+        params['recipes'] * 5
+    )
+    seeder.create_pairs(
+        Follow, ('user_id', 'following_id'), user_ids, user_ids,
+        params['users'] * 5
+    )
+    seeder.write(Favorite, ('user_id', 'recipe_id'), [
+        (user.id, recipe_id)
+        for recipe_id in rng.sample(recipe_ids, params['favorites'])
+    ])
+    seeder.write(ShoppingCart, ('user_id', 'recipe_id'), [
+        (user.id, recipe_id)
+        for recipe_id in rng.sample(recipe_ids, params['cart'])
+    ])
+    seeder.write(Follow, ('user_id', 'following_id'), [
+        (user.id, author_id)
+        for author_id in rng.sample(user_ids, params['follows'])
+    ])
+    Recipe.objects.filter(pk=recipe_ids[0]).update(author_id=user.id)
+    rebuild_shopping_lists([user.id])
+    rebuild_feeds([user.id])
+    refresh_popularity()
+    refresh_neighbours(full=True)
+
+
+def get_context():
+    user = User.objects.get(email=BENCH_EMAIL)
+    recipe = Recipe.objects.filter(author=user).order_by('id').first()
+    favorite = Favorite.objects.filter(user=user).first().recipe_id
+    in_cart = ShoppingCart.objects.filter(user=user).first().recipe_id
+    following = Follow.objects.filter(user=user).first().following_id
+    free = list(
+        Recipe.objects.exclude(favorite__user=user)
+        .exclude(shopping_cart__user=user).order_by('id')
+        .values_list('id', flat=True)[:7]
+    )
+    stranger = (
+        User.objects.exclude(following__user=user).exclude(pk=user.pk)
+        .order_by('id').first().id
+    )
+    ingredients = list(Ingredient.objects.values_list('id', flat=True)[:5])
+    tags = list(Tag.objects.values_list('id', flat=True))
+    payload = {
+        'ingredients': [
+            {'id': ingredient_id, 'amount': 10}
+            for ingredient_id in ingredients
+        ],
+        'tags': tags,
+        'image': IMAGE,
+        'name': 'Рецепт для замера',
+        'text': 'Описание рецепта для замера',
+        'cooking_time': 30,
+    }
+    return {
+        'user': user,
+        'token': Token.objects.get_or_create(user=user)[0].key,
+        'recipe': recipe.id,
+        'short_link': recipe.short_link,
+        'favorite': favorite,
+        'in_cart': in_cart,
+        'free': free[0],
+        'week': {'recipes': free},
+        'author': recipe.author_id,
+        'following': following,
+        'stranger': stranger,
+        'tag': Tag.objects.first().slug,
+        'payload': payload,
+    }
+
+
+def get_endpoints(ctx):
+    recipe = ctx['recipe']
+    return [
+        ('users-list', 'get', '/api/users/', None, False),
+        ('users-detail', 'get', f'/api/users/{ctx["author"]}/', None, False),
+        ('users-me', 'get', '/api/users/me/', None, True),
+        ('users-subscriptions', 'get', '/api/users/subscriptions/',
+         None, True),
+        ('users-subscriptions-limit', 'get',
+         '/api/users/subscriptions/?recipes_limit=3', None, True),
+        ('users-subscribe', 'post',
+         f'/api/users/{ctx["stranger"]}/subscribe/', None, True),
+        ('users-unsubscribe', 'delete',
+         f'/api/users/{ctx["following"]}/subscribe/', None, True),
+        ('tags-list', 'get', '/api/tags/', None, False),
+        ('ingredients-list', 'get', '/api/ingredients/', None, False),
+        ('ingredients-search', 'get', '/api/ingredients/?name=Ингр',
+         None, False),
+        ('recipes-list-anonymous', 'get', '/api/recipes/', None, False),
+        ('recipes-list', 'get', '/api/recipes/', None, True),
+        ('recipes-list-limit-50', 'get', '/api/recipes/?limit=50',
+         None, True),
+        ('recipes-list-card', 'get',
+         '/api/recipes/?fields=name,image,cooking_time,author.first_name,'
+         'author.last_name', None, True),
+        ('recipes-list-popular', 'get', '/api/recipes/?ordering=popular',
+         None, False),
+        ('recipes-list-tags', 'get', f'/api/recipes/?tags={ctx["tag"]}',
+         None, True),
+        ('recipes-list-author', 'get',
+         f'/api/recipes/?author={ctx["following"]}', None, True),
+        ('recipes-list-favorited', 'get', '/api/recipes/?is_favorited=1',
+         None, True),
+        ('recipes-list-in-cart', 'get',
+         '/api/recipes/?is_in_shopping_cart=1', None, True),
+        ('recipes-feed', 'get', '/api/recipes/feed/', None, True),
+        ('recipes-detail', 'get', f'/api/recipes/{recipe}/', None, True),
+        ('recipes-multi-get', 'get',
+         '/api/recipes/?ids=' + ','.join(map(str, ctx['week']['recipes'])),
+         None, True),
+        ('recipes-similar', 'get', f'/api/recipes/{recipe}/similar/',
+         None, False),
+        ('recipes-get-link', 'get', f'/api/recipes/{recipe}/get-link/',
+         None, False),
+        ('recipes-short-link', 'get',
+         f'/api/recipes/s/{ctx["short_link"]}/', None, False),
+        ('recipes-create', 'post', '/api/recipes/', ctx['payload'], True),
+        ('recipes-update', 'patch', f'/api/recipes/{recipe}/',
+         ctx['payload'], True),
+        ('recipes-favorite-add', 'post',
+         f'/api/recipes/{ctx["free"]}/favorite/', None, True),
+        ('recipes-favorite-remove', 'delete',
+         f'/api/recipes/{ctx["favorite"]}/favorite/', None, True),
+        ('recipes-cart-add', 'post',
+         f'/api/recipes/{ctx["free"]}/shopping_cart/', None, True),
+        ('recipes-cart-remove', 'delete',
+         f'/api/recipes/{ctx["in_cart"]}/shopping_cart/', None, True),
+        ('recipes-favorite-batch-add', 'post', '/api/recipes/favorite/',
+         ctx['week'], True),
+        ('recipes-cart-batch-add', 'post', '/api/recipes/shopping_cart/',
+         ctx['week'], True),
+        ('recipes-cart-batch-remove', 'delete',
+         '/api/recipes/shopping_cart/', {'recipes': [ctx['in_cart']]}, True),
+        ('recipes-download-shopping-cart', 'get',
+         '/api/recipes/download_shopping_cart/', None, True),
+    ]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def send(client, method, path, data):
+    # Каждый запрос откатывается, чтобы замеры не меняли набор данных;
+    # отложенные до коммита действия выполняются до отката и входят в замер.
+    with transaction.atomic():
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            response = getattr(client, method)(path, data, format='json')
+        transaction.set_rollback(True)
+    return response
+
+
+def measure(client, method, path, data, repeat, warmup):
+    for _ in range(warmup):
+        send(client, method, path, data)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = send(client, method, path, data)
+        timings.append((time.perf_counter() - started) * 1000)
+    with CaptureQueriesContext(connection) as queries:
+        send(client, method, path, data)
+    queries_count = len(queries)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    send(client, method, path, data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'method': method.upper(),
+        'path': path,
+        'status': response.status_code,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'queries': queries_count,
+        'peak_alloc_kb': round(peak / 1024, 1),
+    }
+
+
+def run_benchmark(scale, repeat, warmup, only=None):
+    ctx = get_context()
+    anonymous = APIClient()
+    authorized = APIClient()
+    authorized.credentials(HTTP_AUTHORIZATION=f'Token {ctx["token"]}')
+    results = {}
+    for name, method, path, data, auth in get_endpoints(ctx):
+        if only and name not in only:
+            continue
+        client = authorized if auth else anonymous
+        results[name] = measure(client, method, path, data, repeat, warmup)
+    return {
+        'meta': {
+            'scale': scale,
+            'params': SCALES[scale],
+            'repeat': repeat,
+            'commit': get_commit(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+        },
+        'results': results,
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_report(path):
+    with open(path, encoding='UTF-8') as file:
+        return json.load(file)
+
+
+def compare_reports(base, head):
+    rows = []
+    for name, new in head['results'].items():
+        old = base['results'].get(name)
+        if old is None:
+            continue
+        rows.append((
+            name,
+            old['p50_ms'], new['p50_ms'],
+            change(old['p50_ms'], new['p50_ms']),
+            old['p95_ms'], new['p95_ms'],
+            change(old['p95_ms'], new['p95_ms']),
+            old['queries'], new['queries'],
+        ))
+    return rows
+
+
+def change(old, new):
+    if not old:
+        return 0.0
+    return round((new - old) / old * 100, 1)
@@ -0,0 +1,60 @@
+import hashlib
+
+from django.utils.http import urlencode
+
+from api.constants import (ANONYMOUS_PAGE_CACHE_TIMEOUT,
+                           ANONYMOUS_PAGE_LOCAL_ENTRIES)
+from backend.invalidation import LocalCache, get_version, get_versions
+
+tags_cache = LocalCache(('tags',))
+ingredients_cache = LocalCache(('ingredients',))
+anonymous_pages = LocalCache(
+    ('catalog',), timeout=ANONYMOUS_PAGE_CACHE_TIMEOUT,
+    max_entries=ANONYMOUS_PAGE_LOCAL_ENTRIES
+)
+
+
+def get_page_cache_key(request, allowed_params):
+    params = sorted(
+        (name, value)
+        for name in request.query_params
+        if name in allowed_params
+        for value in request.query_params.getlist(name)
+    )
+    digest = hashlib.sha1(
+        f'{request.scheme}://{request.get_host()}{request.path}?'
+        f'{urlencode(params)}'.encode()
+    ).hexdigest()
+    return f'anonymous-page:{get_version("catalog")}:{digest}'
+
+
+def get_count_cache_key(request, ignored_params, namespaces=()):
+    # Ключ не зависит от порядка параметров и значений. Для авторизованных
+    # учитываются их id и версия их личных данных: от них зависят фильтры
+    # избранного, корзины и подписок. namespaces — пространства, общие
+    # для всех пользователей, например пересчёта рекомендаций.
+    params = sorted(
+        (name, value)
+        for name in request.query_params
+        if name not in ignored_params
+        for value in request.query_params.getlist(name)
+    )
+    digest = hashlib.sha1(
+        f'{request.path}?{urlencode(params)}'.encode()
+    ).hexdigest()
+    versions = ':'.join(map(str, get_versions('catalog', *namespaces)))
+    user = request.user
+    if not user.is_authenticated:
+        return f'count:{versions}:{digest}'
+    personal = get_version(f'user:{user.pk}')
+    return f'count:{versions}:{personal}:{user.pk}:{digest}'
+
+
+def get_cached_list(local_cache, view):
+    # Справочник целиком хранится в памяти воркера: он мал, меняется
+    # редко, а с preload заполняется ещё в мастере до fork.
+    data = local_cache.get('list')
+    if data is None:
+        data = view.get_serializer(view.get_queryset(), many=True).data
+        local_cache.set('list', data)
+    return data
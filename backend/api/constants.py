@@ -1,2 +1,70 @@
 MIN_AMOUNT = 1
 FILENAME_SHOPPING_LIST = 'shopping-list.txt'
+MAX_BATCH_RECIPES = 100
+RECIPE_ORDERINGS = {
+    'popular': ('-popularity', '-id'),
+    'new': ('-pub_date', '-id'),
+    'cooking_time': ('cooking_time', '-id'),
+    'views': ('-views', '-id'),
+}
+ANONYMOUS_PAGE_CACHE_TIMEOUT = 60
+ANONYMOUS_PAGE_LOCAL_ENTRIES = 256
+COUNT_CACHE_TIMEOUT = 300
+# Выше этого числа по оценке планировщика анонимам отдаётся
+# приблизительное число рецептов вместо COUNT(*).
+COUNT_EXACT_LIMIT = 10_000
+# Параметры, которые не меняют число объектов в выборке.
+COUNT_IGNORED_PARAMS = ('ordering', 'recipes_limit', 'fields', 'omit')
+# Выборочные поля ответа: ?fields=id,name,author.username и ?omit=text.
+FIELDSET_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+# Поля, которые попадают в ответ при любых ?fields= и ?omit=.
+FIELDSET_ALWAYS = ('id',)
+# Выборка объектов по списку id: ?ids=1,2,3 вместо запроса на каждый.
+MULTI_GET_PARAM = 'ids'
+MULTI_GET_LIMIT = 100
+# Ответы короче порога не сжимаются: заголовки и CPU съедят выигрыш.
+COMPRESSION_MIN_LENGTH = 1024
+# Пороги по имени маршрута; None отключает сжатие для маршрута.
+COMPRESSION_THRESHOLDS = {
+    'ingredients-list': 512,
+    'recipes-list': 512,
+    'recipes-feed': 512,
+    'users-subscriptions': 512,
+    'recipes-get-link': None,
+    'recipes-download-shopping-cart': None,
+}
+COMPRESSION_LEVELS = {'br': 4, 'zstd': 3, 'gzip': 6}
+# Сжимаются только ответы API в JSON. HTML админки и форм несёт
+# CSRF-токен рядом с данными пользователя, и сжатие открыло бы его
+# для BREACH.
+COMPRESSIBLE_TYPES = ('application/json',)
+COMPRESSIBLE_PATH = '/api/'
+# Ведро токенов: (ёмкость, за сколько секунд наполняется целиком).
+THROTTLE_BUCKETS = {
+    'anon': (60, 60),
+    'user': (240, 60),
+    'ip': (600, 60),
+}
+THROTTLE_DEFAULT_COST = 1
+# Сколько байт тела запроса стоят ещё один токен (картинки в base64).
+THROTTLE_BODY_COST_BYTES = 100 * 1024
+THROTTLE_SLOTS = 65_536
+THROTTLE_PROBE = 8
+# Поток событий SSE о новых рецептах авторов из подписок.
+SSE_PATH = '/api/events/'
+SSE_HEARTBEAT = 15
+SSE_RETRY_MS = 5_000
+SSE_POLL_INTERVAL = 1
+# Событие видно после коммита, а время ему ставится раньше: опрос
+# захватывает окно назад, уже доставленные события отсекаются по id.
+SSE_POLL_LOOKBACK = 5
+SSE_QUEUE_SIZE = 100
+SSE_RESUME_LIMIT = 100
+SSE_EVENT_RETENTION = 24 * 60 * 60
+SSE_PURGE_INTERVAL = 60 * 60
+# Браузерный EventSource не умеет ставить заголовки, а токен в адресе
+# попал бы в журналы доступа. Вместо него клиент берёт одноразовый
+# билет, который живёт несколько секунд.
+SSE_TICKET_PARAM = 'ticket'
+SSE_TICKET_TIMEOUT = 30
@@ -0,0 +1,328 @@
+import asyncio
+import json
+import logging
+import secrets
+import time
+from collections import defaultdict
+from datetime import timedelta
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api.constants import (SSE_EVENT_RETENTION, SSE_HEARTBEAT,
+                           SSE_POLL_INTERVAL, SSE_POLL_LOOKBACK,
+                           SSE_PURGE_INTERVAL, SSE_QUEUE_SIZE,
+                           SSE_RESUME_LIMIT, SSE_RETRY_MS, SSE_TICKET_PARAM,
+                           SSE_TICKET_TIMEOUT)
+from backend.invalidation import get_version, store
+from recipes.models import RecipeEvent
+from users.models import Follow
+
+logger = logging.getLogger(__name__)
+
+TICKET_SALT = 'api.events.ticket'
+EVENT_FIELDS = ('id', 'recipe_id', 'author_id', 'recipe__name', 'created')
+
+
+def database(func):
+    # ORM синхронный: запросы уходят в пул потоков, соединение
+    # закрывается сразу, как после обычного запроса Django.
+    def wrapper(*args):
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+    return sync_to_async(wrapper, thread_sensitive=False)
+
+
+@database
+def authenticate(key):
+    return Token.objects.filter(
+        key=key, user__is_active=True
+    ).values_list('user_id', flat=True).first()
+
+
+def issue_ticket(user_id):
+    # Билет подписан SECRET_KEY и живёт SSE_TICKET_TIMEOUT, поэтому
+    # сервису событий не нужен общий с бэкендом кеш. Одноразовость
+    # держится на версии пространства билета в общем файле версий:
+    # при выдаче она запоминается в билете, при входе поднимается.
+    nonce = secrets.token_urlsafe(16)
+    version = get_version(f'events-ticket:{nonce}')
+    return signing.dumps((user_id, nonce, version), salt=TICKET_SALT)
+
+
+def take_ticket(ticket):
+    try:
+        user_id, nonce, version = signing.loads(
+            ticket, salt=TICKET_SALT, max_age=SSE_TICKET_TIMEOUT
+        )
+    except (signing.BadSignature, ValueError):
+        return None
+    # Подъём версии атомарен: из одновременных входов по одному билету
+    # версию на единицу больше выданной увидит только первый.
+    if store.bump(f'events-ticket:{nonce}') != version + 1:
+        return None
+    return user_id
+
+
+@database
+def get_follows(user_id):
+    # Версия подписок берётся до их чтения: если подписка изменится
+    # между ними, следующая проверка это заметит.
+    version = get_version(f'follows:{user_id}')
+    return version, set(
+        Follow.objects.filter(user=user_id)
+        .values_list('following', flat=True)
+    )
+
+
+@database
+def get_backlog(authors, last_id):
+    return list(
+        RecipeEvent.objects.filter(id__gt=last_id, author__in=authors)
+        .order_by('id').values(*EVENT_FIELDS)[:SSE_RESUME_LIMIT]
+    )
+
+
+@database
+def get_recent(since):
+    return list(
+        RecipeEvent.objects.filter(created__gte=since)
+        .order_by('id').values(*EVENT_FIELDS)
+    )
+
+
+@database
+def purge_events():
+    RecipeEvent.objects.filter(
+        created__lt=timezone.now() - timedelta(seconds=SSE_EVENT_RETENTION)
+    ).delete()
+
+
+def format_event(event):
+    data = json.dumps({
+        'id': event['recipe_id'],
+        'name': event['recipe__name'],
+        'author': event['author_id'],
+    }, ensure_ascii=False)
+    return f'id: {event["id"]}\nevent: recipe\ndata: {data}\n\n'.encode()
+
+
+class Stream:
+
+    def __init__(self, user_id, authors):
+        self.user_id = user_id
+        self.authors = authors
+        self.queue = asyncio.Queue()
+        self.sent = set()
+
+    def push(self, event):
+        # Медленный клиент не копит события в памяти: поток закрывается,
+        # клиент переподключится с Last-Event-ID и дочитает из базы.
+        if self.queue.qsize() >= SSE_QUEUE_SIZE:
+            self.queue.put_nowait(None)
+        else:
+            self.queue.put_nowait(event)
+
+
+class EventHub:
+    # Один на процесс. Новые события читаются из таблицы одним запросом
+    # раз в SSE_POLL_INTERVAL на весь процесс и раздаются подписчикам
+    # автора в памяти; таблица заменяет брокер сообщений между
+    # процессами.
+
+    def __init__(self):
+        self.followers = defaultdict(set)
+        self.streams = 0
+        self.poller = None
+        self.delivered = {}
+
+    def subscribe(self, stream):
+        for author_id in stream.authors:
+            self.followers[author_id].add(stream)
+        self.streams += 1
+        if self.poller is None or self.poller.done():
+            self.poller = asyncio.ensure_future(self.poll())
+
+    def unsubscribe(self, stream):
+        for author_id in stream.authors:
+            streams = self.followers.get(author_id)
+            if streams is None:
+                continue
+            streams.discard(stream)
+            if not streams:
+                del self.followers[author_id]
+        self.streams -= 1
+
+    def resubscribe(self, stream, authors):
+        self.unsubscribe(stream)
+        stream.authors = authors
+        self.subscribe(stream)
+
+    def publish(self, event):
+        for stream in tuple(self.followers.get(event['author_id'], ())):
+            stream.push(event)
+
+    async def poll(self):
+        # События, созданные до запуска опроса, не рассылаются: их
+        # клиенты дочитывают по Last-Event-ID.
+        since = first = timezone.now()
+        purged = 0
+        while self.streams:
+            await asyncio.sleep(SSE_POLL_INTERVAL)
+            started = timezone.now()
+            try:
+                events = await get_recent(
+                    since - timedelta(seconds=SSE_POLL_LOOKBACK)
+                )
+            except DatabaseError:
+                logger.exception('Не удалось прочитать события рецептов')
+                continue
+            for event in events:
+                if event['id'] in self.delivered:
+                    continue
+                self.delivered[event['id']] = event['created']
+                if event['created'] >= first:
+                    self.publish(event)
+            since = started
+            horizon = since - timedelta(seconds=SSE_POLL_LOOKBACK * 2)
+            self.delivered = {
+                event_id: created
+                for event_id, created in self.delivered.items()
+                if created >= horizon
+            }
+            if time.monotonic() - purged > SSE_PURGE_INTERVAL:
+                purged = time.monotonic()
+                try:
+                    await purge_events()
+                except DatabaseError:
+                    logger.exception('Не удалось удалить старые события')
+
+
+hub = EventHub()
+
+
+def get_headers(scope):
+    return {
+        name.decode('latin-1').lower(): value.decode('latin-1')
+        for name, value in scope['headers']
+    }
+
+
+def get_token(headers):
+    scheme, _, key = headers.get('authorization', '').partition(' ')
+    if scheme.lower() == 'token' and key:
+        return key.strip()
+    return None
+
+
+def get_last_event_id(headers, query):
+    value = headers.get('last-event-id') or query.get(
+        'last_event_id', [''])[0]
+    return int(value) if value.isdigit() else None
+
+
+async def respond(send, status, payload):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': json.dumps(payload, ensure_ascii=False).encode(),
+    })
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def events_application(scope, receive, send):
+    if scope['method'] != 'GET':
+        return await respond(
+            send, 405, {'detail': f'Метод "{scope["method"]}" не разрешен.'}
+        )
+    headers = get_headers(scope)
+    query = parse_qs(scope['query_string'].decode('latin-1'))
+    key = get_token(headers)
+    ticket = query.get(SSE_TICKET_PARAM, [None])[0]
+    if key:
+        user_id = await authenticate(key)
+    elif ticket:
+        user_id = take_ticket(ticket)
+    else:
+        user_id = None
+    if user_id is None:
+        return await respond(
+            send, 401, {'detail': 'Учетные данные не были предоставлены.'}
+        )
+    version, authors = await get_follows(user_id)
+    stream = Stream(user_id, authors)
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': f'retry: {SSE_RETRY_MS}\n\n'.encode(),
+        'more_body': True,
+    })
+    # Подписка раньше чтения пропущенного: событие, пришедшее между
+    # ними, окажется в очереди и отсеется по id.
+    hub.subscribe(stream)
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        last_id = get_last_event_id(headers, query)
+        if last_id is not None and authors:
+            for event in await get_backlog(authors, last_id):
+                stream.sent.add(event['id'])
+                await send({
+                    'type': 'http.response.body',
+                    'body': format_event(event),
+                    'more_body': True,
+                })
+        while True:
+            message = asyncio.ensure_future(stream.queue.get())
+            done, _ = await asyncio.wait(
+                {message, disconnect}, timeout=SSE_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnect in done:
+                message.cancel()
+                break
+            if message not in done:
+                message.cancel()
+                body = b': ping\n\n'
+                # Версия читается из памяти, без запроса к базе:
+                # подписки перечитываются, только когда изменились.
+                if get_version(f'follows:{user_id}') != version:
+                    version, authors = await get_follows(user_id)
+                    hub.resubscribe(stream, authors)
+            else:
+                event = message.result()
+                if event is None:
+                    break
+                if event['id'] in stream.sent:
+                    continue
+                body = format_event(event)
+            await send({
+                'type': 'http.response.body',
+                'body': body,
+                'more_body': True,
+            })
+    finally:
+        hub.unsubscribe(stream)
+        disconnect.cancel()
+    await send({'type': 'http.response.body', 'body': b''})
@@ -0,0 +1,83 @@
+from rest_framework.exceptions import ValidationError
+
+from api.constants import FIELDSET_ALWAYS, FIELDSET_PARAM, OMIT_PARAM
+
+
+def split_names(values):
+    return [
+        name.strip() for value in values for name in value.split(',')
+        if name.strip()
+    ]
+
+
+def get_fieldset(request, available):
+    # available — словарь {поле: вложенные поля} в порядке вывода.
+    # Возвращает такой же словарь только с выбранными полями или None,
+    # если клиент не ограничивал ответ.
+    fields = split_names(request.query_params.getlist(FIELDSET_PARAM))
+    omit = split_names(request.query_params.getlist(OMIT_PARAM))
+    if not fields and not omit:
+        return None
+    unknown = [
+        name for name in fields + omit
+        if not is_known(name.split('.'), available)
+    ]
+    if unknown:
+        raise ValidationError(
+            {'fields': f'Неизвестные поля: {", ".join(unknown)}'}
+        )
+    if fields:
+        selected = {
+            name: set(available[name])
+            for name in FIELDSET_ALWAYS if name in available
+        }
+        for name in fields:
+            top, _, nested = name.partition('.')
+            subfields = selected.setdefault(top, set())
+            if nested:
+                subfields.add(nested)
+            else:
+                subfields.update(available[top])
+    else:
+        selected = {name: set(nested) for name, nested in available.items()}
+    for name in omit:
+        top, _, nested = name.partition('.')
+        if not nested:
+            if top not in FIELDSET_ALWAYS:
+                selected.pop(top, None)
+        elif top in selected:
+            selected[top].discard(nested)
+    return {
+        name: tuple(field for field in nested if field in selected[name])
+        for name, nested in available.items()
+        if name in selected and (selected[name] or not nested)
+    }
+
+
+def is_known(path, available):
+    if len(path) == 1:
+        return path[0] in available
+    return len(path) == 2 and path[1] in available.get(path[0], ())
+
+
+def select_fields(data, fieldset):
+    return {
+        name: select_fields(data[name], dict.fromkeys(nested, ()))
+        if nested else data[name]
+        for name, nested in fieldset.items()
+    }
+
+
+def apply_fieldset(serializer, fieldset):
+    for name in list(serializer.fields):
+        if name not in fieldset:
+            serializer.fields.pop(name)
+        elif fieldset[name]:
+            apply_fieldset(
+                serializer.fields[name], dict.fromkeys(fieldset[name], ())
+            )
+
+
+def get_columns(model, fieldset):
+    columns = {field.name for field in model._meta.concrete_fields}
+    return [name for name in fieldset if name in columns]
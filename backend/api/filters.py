@@ -1,5 +1,6 @@
 from django_filters.rest_framework import FilterSet, filters
 
+from api.constants import RECIPE_ORDERINGS
 from recipes.models import Recipe, Tag
 
 
@@ -13,11 +14,15 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart'
     )
+    ordering = filters.ChoiceFilter(
+        choices=[(value, value) for value in RECIPE_ORDERINGS],
+        method='get_ordering'
+    )
 
     class Meta:
         model = Recipe
         fields = ('author', 'author__id', 'tags',
-                  'is_favorited', 'is_in_shopping_cart')
+                  'is_favorited', 'is_in_shopping_cart', 'ordering')
 
     def get_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated and value is True:
@@ -28,3 +33,6 @@ class RecipeFilter(FilterSet):
         if self.request.user.is_authenticated and value is True:
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
+
+    def get_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
@@ -0,0 +1,132 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+
+from api.benchmark import (SCALES, build_dataset, compare_reports, load_report,
+                           run_benchmark)
+from recipes.models import Recipe
+from recipes.view_counts import flush as flush_views
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа эндпоинтов API на тестовой базе '
+        'с воспроизводимым набором данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', choices=sorted(SCALES), default='small',
+            help='Размер набора данных.'
+        )
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', help='Файл для сохранения результатов в JSON.'
+        )
+        parser.add_argument(
+            '--only', nargs='+', help='Замерить только указанные эндпоинты.'
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не удалять тестовую базу, чтобы не заполнять её заново.'
+        )
+        parser.add_argument(
+            '--compare', nargs=2, metavar=('BASE', 'HEAD'),
+            help='Сравнить два сохранённых отчёта.'
+        )
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            return self.compare(*options['compare'])
+        scale = options['scale']
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        if connection.vendor == 'sqlite':
+            test_settings['NAME'] = os.path.join(
+                settings.BASE_DIR, f'benchmark_{scale}.sqlite3'
+            )
+        else:
+            test_settings['NAME'] = f'test_benchmark_{scale}'
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        try:
+            if not Recipe.objects.exists():
+                self.stdout.write(f'Заполняем базу: {SCALES[scale]}')
+                build_dataset(scale, options['seed'])
+            with tempfile.TemporaryDirectory() as temp_dir:
+                # Замеры идут на своём кеше в памяти процесса: страницы
+                # из общего memcached в них не подмешиваются.
+                caches = {
+                    alias: {
+                        'BACKEND':
+                            'django.core.cache.backends.locmem.LocMemCache',
+                        'LOCATION': f'benchmark-{alias}',
+                    }
+                    for alias in settings.CACHES
+                }
+                # Повторы одного запроса быстро исчерпали бы вёдра
+                # ограничителя частоты, замеры шли бы по ответам 429.
+                with override_settings(
+                        MEDIA_ROOT=os.path.join(temp_dir, 'media'),
+                        CACHES=caches, THROTTLE_ENABLED=False):
+                    report = run_benchmark(
+                        scale, options['repeat'], options['warmup'],
+                        options['only']
+                    )
+        finally:
+            # Просмотры, накопленные замерами, пишутся в тестовую базу до
+            # её удаления, а не при выходе процесса.
+            flush_views()
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb']
+            )
+            teardown_test_environment()
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='UTF-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Результаты сохранены в {options["output"]}'
+            ))
+
+    def print_report(self, report):
+        self.stdout.write(
+            f'{"endpoint":<34}{"status":>7}{"p50 ms":>10}{"p95 ms":>10}'
+            f'{"queries":>9}{"peak KiB":>10}'
+        )
+        for name, result in report['results'].items():
+            self.stdout.write(
+                f'{name:<34}{result["status"]:>7}{result["p50_ms"]:>10}'
+                f'{result["p95_ms"]:>10}{result["queries"]:>9}'
+                f'{result["peak_alloc_kb"]:>10}'
+            )
+
+    def compare(self, base_path, head_path):
+        try:
+            base, head = load_report(base_path), load_report(head_path)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Не удалось прочитать отчёт: {error}')
+        if base['meta']['scale'] != head['meta']['scale']:
+            self.stderr.write('Отчёты сняты на разных наборах данных.')
+        self.stdout.write(
+            f'{base["meta"]["commit"]} -> {head["meta"]["commit"]}\n'
+            f'{"endpoint":<34}{"p50 ms":>18}{"Δ%":>8}'
+            f'{"p95 ms":>18}{"Δ%":>8}{"queries":>10}'
+        )
+        for row in compare_reports(base, head):
+            (name, old_p50, new_p50, p50_change,
+             old_p95, new_p95, p95_change, old_queries, new_queries) = row
+            self.stdout.write(
+                f'{name:<34}{f"{old_p50} -> {new_p50}":>18}{p50_change:>8}'
+                f'{f"{old_p95} -> {new_p95}":>18}{p95_change:>8}'
+                f'{f"{old_queries} -> {new_queries}":>10}'
+            )
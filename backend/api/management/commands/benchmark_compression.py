@@ -0,0 +1,67 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from api.constants import COMPRESSION_LEVELS
+from api.middleware import ENCODERS
+from recipes.models import Recipe
+from users.models import User
+
+LEVELS = {'br': (1, 4, 6, 11), 'zstd': (1, 3, 9, 19), 'gzip': (1, 6, 9)}
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает степень сжатия и время кодирования ответов API '
+        'для доступных кодеков и уровней.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=20)
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Дополнительный путь для замера, можно указать несколько.'
+        )
+
+    def handle(self, *args, **options):
+        client = APIClient()
+        user = User.objects.order_by('id').first()
+        recipe = Recipe.objects.order_by('id').first()
+        paths = [
+            '/api/ingredients/',
+            '/api/tags/',
+            '/api/recipes/',
+            '/api/recipes/?limit=50',
+            '/api/users/',
+        ]
+        if recipe is not None:
+            paths.append(f'/api/recipes/{recipe.id}/')
+        paths += options['paths'] or []
+        if user is not None:
+            client.force_authenticate(user)
+            paths.append('/api/users/subscriptions/')
+        for path in paths:
+            response = client.get(path, HTTP_HOST='localhost')
+            content = response.content
+            self.stdout.write(
+                f'{path} [{response.status_code}] {len(content)} B'
+            )
+            for encoding, encoder in ENCODERS.items():
+                for level in LEVELS[encoding]:
+                    self.report(
+                        encoding, level, encoder, content, options['number']
+                    )
+
+    def report(self, encoding, level, encoder, content, number):
+        size = len(encoder(content, level))
+        seconds = min(timeit.repeat(
+            lambda: encoder(content, level), number=number, repeat=3
+        )) / number
+        default = '*' if COMPRESSION_LEVELS[encoding] == level else ' '
+        self.stdout.write(
+            f'  {encoding:<4} {level:>2}{default} {size:>9} B '
+            f'{size / len(content) * 100:5.1f}% '
+            f'{seconds * 1000:8.3f} ms '
+            f'{len(content) / seconds / 2 ** 20:8.1f} MiB/s'
+        )
@@ -0,0 +1,95 @@
+import base64
+import io
+import json
+import os
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.parsers import FastJSONParser, orjson
+from api.renderers import FastJSONRenderer
+from api.serializer import RecipeSerializer
+from api.views import RecipeViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает стандартные и быстрые JSON-рендерер и парсер '
+        'на реальных данных RecipeSerializer.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=50,
+            help='Сколько рецептов положить на страницу.'
+        )
+        parser.add_argument('--number', type=int, default=200)
+        parser.add_argument(
+            '--image-kb', type=int, default=1024,
+            help='Размер картинки в теле запроса на создание рецепта.'
+        )
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write('orjson не установлен, замеряется fallback.')
+        request = Request(
+            APIRequestFactory().get('/api/recipes/', HTTP_HOST='localhost')
+        )
+        recipes = RecipeViewSet.queryset[:options['limit']]
+        data = {
+            'count': len(recipes),
+            'next': None,
+            'previous': None,
+            'results': RecipeSerializer(
+                recipes, many=True, context={'request': request}
+            ).data,
+        }
+        if not data['results']:
+            raise CommandError('В базе нет рецептов.')
+        expected = JSONRenderer().render(data)
+        # Сравниваются значения: запись чисел с плавающей точкой у
+        # рендереров может отличаться.
+        if json.loads(FastJSONRenderer().render(data)) != json.loads(expected):
+            raise CommandError('Вывод рендереров различается.')
+        self.compare(
+            f'render {len(data["results"])} рецептов, '
+            f'{len(expected) // 1024} KiB',
+            lambda: JSONRenderer().render(data),
+            lambda: FastJSONRenderer().render(data),
+            options['number']
+        )
+        image = base64.b64encode(os.urandom(options['image_kb'] * 1024))
+        body = json.dumps({
+            'ingredients': [{'id': 1, 'amount': 10}] * 20,
+            'tags': [1, 2],
+            'image': f'data:image/png;base64,{image.decode()}',
+            'name': 'Рецепт',
+            'text': 'Описание рецепта. ' * 200,
+            'cooking_time': 30,
+        }, ensure_ascii=False).encode()
+        if (FastJSONParser().parse(_stream(body))
+                != JSONParser().parse(_stream(body))):
+            raise CommandError('Результаты парсеров различаются.')
+        self.compare(
+            f'parse тела {len(body) // 1024} KiB',
+            lambda: JSONParser().parse(_stream(body)),
+            lambda: FastJSONParser().parse(_stream(body)),
+            max(1, options['number'] // 10)
+        )
+
+    def compare(self, title, standard, fast, number):
+        standard_time = min(timeit.repeat(standard, number=number, repeat=3))
+        fast_time = min(timeit.repeat(fast, number=number, repeat=3))
+        self.stdout.write(
+            f'{title}: json {standard_time / number * 1000:.3f} ms, '
+            f'fast {fast_time / number * 1000:.3f} ms, '
+            f'x{standard_time / fast_time:.1f}'
+        )
+
+
+def _stream(body):
+    return io.BytesIO(body)
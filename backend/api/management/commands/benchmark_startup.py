@@ -0,0 +1,113 @@
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+from threading import Thread
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.warmup import WARMUP_PATHS, get_memory
+
+# cold повторяет прежний запуск: без preload и без прогрева.
+MODES = {
+    'cold': {'GUNICORN_PRELOAD': 'False', 'GUNICORN_WARMUP': 'False'},
+    'warm': {'GUNICORN_PRELOAD': 'False', 'GUNICORN_WARMUP': 'True'},
+    'preload': {'GUNICORN_PRELOAD': 'True', 'GUNICORN_WARMUP': 'True'},
+}
+WORKER_READY = re.compile(r'Воркер (\d+) готов за (\d+) мс')
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает gunicorn в разных режимах и замеряет время старта '
+        'воркеров, задержку первых запросов и память воркеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modes', nargs='+', choices=list(MODES),
+            default=['cold', 'preload']
+        )
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--timeout', type=float, default=60)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"mode":<9}{"ready ms":>10}{"boot ms":>9}{"first ms":>10}'
+            f'{"second ms":>11}{"RSS MiB":>9}{"PSS MiB":>9}'
+        )
+        for mode in options['modes']:
+            result = self.run_mode(mode, options)
+            self.stdout.write(
+                f'{mode:<9}{result["ready"]:>10.0f}{result["boot"]:>9.0f}'
+                f'{result["first"]:>10.1f}{result["second"]:>11.1f}'
+                f'{result["rss"]:>9.1f}{result["pss"]:>9.1f}'
+            )
+
+    def run_mode(self, mode, options):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        env = {**os.environ, **MODES[mode], 'THROTTLE_ENABLED': 'False'}
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'backend.wsgi:application',
+             '--config', os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'),
+             '--bind', f'127.0.0.1:{port}',
+             '--workers', str(options['workers'])],
+            cwd=settings.BASE_DIR, env=env, stderr=subprocess.PIPE, text=True
+        )
+        try:
+            boot = self.wait_workers(process, options)
+            ready = (time.perf_counter() - started) * 1000
+            first = self.request_all(port)
+            second = self.request_all(port)
+            memory = [get_memory(pid) for pid in boot]
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait()
+        return {
+            'ready': ready,
+            'boot': max(boot.values()),
+            'first': first,
+            'second': second,
+            'rss': sum(item.get('rss') or 0 for item in memory) / 1024,
+            'pss': sum(item.get('pss') or 0 for item in memory) / 1024,
+        }
+
+    def wait_workers(self, process, options):
+        ready, lines, seen = {}, [], 0
+        Thread(
+            target=lambda: lines.extend(process.stderr), daemon=True
+        ).start()
+        deadline = time.monotonic() + options['timeout']
+        while len(ready) < options['workers']:
+            if time.monotonic() > deadline or process.poll() is not None:
+                raise CommandError(
+                    'gunicorn не запустился:\n' + ''.join(lines[-20:])
+                )
+            for line in lines[seen:]:
+                if match := WORKER_READY.search(line):
+                    ready[int(match[1])] = float(match[2])
+            seen = len(lines)
+            time.sleep(0.01)
+        return ready
+
+    def request_all(self, port):
+        # Средняя задержка по набору запросов прогрева.
+        timings = []
+        for path in WARMUP_PATHS:
+            started = time.perf_counter()
+            try:
+                with urlopen(f'http://127.0.0.1:{port}{path}') as response:
+                    response.read()
+            except URLError as error:
+                raise CommandError(f'{path}: {error}')
+            timings.append((time.perf_counter() - started) * 1000)
+        return sum(timings) / len(timings)
@@ -0,0 +1,81 @@
+import json
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.fieldsets import get_fieldset
+from api.readers import RECIPE_FIELDSET, read_recipes
+from api.serializer import RecipeSerializer
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет вывод быстрого чтения рецептов с RecipeSerializer '
+        'для анонима и для пользователя.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500)
+        parser.add_argument(
+            '--user', type=int,
+            help='id пользователя; по умолчанию самый активный в избранном.'
+        )
+        parser.add_argument(
+            '--fields', help='Выборка полей, как в параметре ?fields=.'
+        )
+        parser.add_argument(
+            '--omit', help='Исключаемые поля, как в параметре ?omit=.'
+        )
+
+    def handle(self, *args, **options):
+        recipe_ids = list(
+            Recipe.objects.order_by('-id')
+            .values_list('id', flat=True)[:options['limit']]
+        )
+        if options['user']:
+            user = User.objects.filter(pk=options['user']).first()
+            if user is None:
+                raise CommandError('Пользователь не найден.')
+        else:
+            user = User.objects.filter(
+                favorite__recipe__in=recipe_ids
+            ).order_by('id').first()
+        params = {
+            name: options[name] for name in ('fields', 'omit')
+            if options[name]
+        }
+        mismatches = 0
+        for current in (AnonymousUser(), user):
+            if current is None:
+                continue
+            request = Request(APIRequestFactory().get(
+                '/api/recipes/', params, HTTP_HOST='localhost'
+            ))
+            request.user = current
+            fieldset = get_fieldset(request, RECIPE_FIELDSET)
+            expected = RecipeSerializer(
+                Recipe.objects.filter(pk__in=recipe_ids).order_by('-id')
+                .select_related('author').prefetch_related('tags'),
+                many=True, context={'request': request, 'fieldset': fieldset}
+            ).data
+            actual = read_recipes(recipe_ids, request, fieldset)
+            for left, right in zip(expected, actual):
+                if (json.dumps(left, ensure_ascii=False)
+                        != json.dumps(right, ensure_ascii=False)):
+                    mismatches += 1
+                    self.stderr.write(
+                        f'Рецепт {left["id"]} ({current}): '
+                        f'{json.dumps(left, ensure_ascii=False)} != '
+                        f'{json.dumps(right, ensure_ascii=False)}'
+                    )
+            if len(expected) != len(actual):
+                raise CommandError(
+                    f'Разное число рецептов: {len(expected)} и {len(actual)}'
+                )
+            self.stdout.write(f'{current}: проверено {len(actual)} рецептов')
+        if mismatches:
+            raise CommandError(f'Расхождений: {mismatches}')
@@ -0,0 +1,139 @@
+import json
+import os
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.querylog import LOG_BACKUP_COUNT
+
+SORT_KEYS = {
+    'total': lambda group: group['total_ms'],
+    'count': lambda group: group['count'],
+    'mean': lambda group: group['total_ms'] / group['count'],
+    'max': lambda group: group['max_ms'],
+}
+
+
+def read_records(path, since=None):
+    # Читает текущий файл журнала и все его ротации.
+    paths = [path] + [
+        f'{path}.{number}' for number in range(1, LOG_BACKUP_COUNT + 1)
+    ]
+    for name in paths:
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding='UTF-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if since is None or record['time'] >= since:
+                    yield record
+
+
+def group_records(records, view=None):
+    groups = {}
+    for record in records:
+        if view and view not in (record['view'] or ''):
+            continue
+        group = groups.get(record['fingerprint'])
+        if group is None:
+            group = groups[record['fingerprint']] = {
+                'fingerprint': record['fingerprint'],
+                'sql': record['sql'],
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'views': Counter(),
+                'frames': Counter(),
+                'plan': None,
+            }
+        group['count'] += 1
+        group['total_ms'] += record['duration_ms']
+        group['max_ms'] = max(group['max_ms'], record['duration_ms'])
+        group['views'][record['view']] += 1
+        group['frames'][record['frame']] += 1
+        if record.get('plan') is not None:
+            # Сохраняется план самого медленного выполнения с планом.
+            if (group['plan'] is None
+                    or record['duration_ms'] >= group['plan_ms']):
+                group['plan'] = record['plan']
+                group['plan_ms'] = record['duration_ms']
+    return list(groups.values())
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка журнала медленных запросов: группы одинаковых запросов '
+        'по суммарному времени, маршрутам и месту вызова.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=settings.SLOW_QUERY_LOG)
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument(
+            '--sort', choices=tuple(SORT_KEYS), default='total'
+        )
+        parser.add_argument(
+            '--hours', type=float,
+            help='Учитывать только записи за последние часы.'
+        )
+        parser.add_argument(
+            '--view', help='Подстрока маршрута, например recipes-list.'
+        )
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Показать планы PostgreSQL, если они сняты.'
+        )
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['log']):
+            raise CommandError(f'Журнал не найден: {options["log"]}')
+        since = None
+        if options['hours']:
+            since = time.time() - options['hours'] * 60 * 60
+        groups = sorted(
+            group_records(
+                read_records(options['log'], since), options['view']
+            ),
+            key=SORT_KEYS[options['sort']], reverse=True
+        )[:options['top']]
+        if options['json']:
+            self.stdout.write(json.dumps([{
+                'fingerprint': group['fingerprint'],
+                'sql': group['sql'],
+                'count': group['count'],
+                'total_ms': round(group['total_ms'], 3),
+                'mean_ms': round(group['total_ms'] / group['count'], 3),
+                'max_ms': group['max_ms'],
+                'views': dict(group['views'].most_common()),
+                'frames': dict(group['frames'].most_common()),
+                'plan': group['plan'],
+            } for group in groups], ensure_ascii=False, indent=2))
+            return
+        if not groups:
+            self.stdout.write('Медленных запросов нет.')
+            return
+        self.stdout.write(
+            f'{"total ms":>12}{"count":>8}{"mean ms":>10}{"max ms":>10}  '
+            'запрос'
+        )
+        for group in groups:
+            self.stdout.write(
+                f'{group["total_ms"]:>12.1f}{group["count"]:>8}'
+                f'{group["total_ms"] / group["count"]:>10.1f}'
+                f'{group["max_ms"]:>10.1f}  {group["fingerprint"]}'
+            )
+            self.stdout.write(f'    {group["sql"][:200]}')
+            view, hits = group['views'].most_common(1)[0]
+            self.stdout.write(f'    маршрут: {view} ({hits})')
+            frame, hits = group['frames'].most_common(1)[0]
+            self.stdout.write(f'    место: {frame} ({hits})')
+            if options['plans'] and group['plan'] is not None:
+                self.stdout.write(
+                    '    план: ' + json.dumps(group['plan'], indent=2)
+                )
@@ -0,0 +1,117 @@
+import gzip
+
+from django.utils.cache import patch_vary_headers
+
+from api.constants import (COMPRESSIBLE_PATH, COMPRESSIBLE_TYPES,
+                           COMPRESSION_LEVELS, COMPRESSION_MIN_LENGTH,
+                           COMPRESSION_THRESHOLDS)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def compress_gzip(content, level=COMPRESSION_LEVELS['gzip']):
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+def compress_brotli(content, level=COMPRESSION_LEVELS['br']):
+    return brotli.compress(content, quality=level)
+
+
+def compress_zstd(content, level=COMPRESSION_LEVELS['zstd']):
+    return zstandard.ZstdCompressor(level=level).compress(content)
+
+
+# Порядок задаёт предпочтение сервера при равных q у клиента.
+ENCODERS = {}
+if brotli is not None:
+    ENCODERS['br'] = compress_brotli
+if zstandard is not None:
+    ENCODERS['zstd'] = compress_zstd
+ENCODERS['gzip'] = compress_gzip
+
+
+def parse_accept_encoding(header):
+    weights = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[coding] = quality
+    return weights
+
+
+def choose_encoding(header):
+    weights = parse_accept_encoding(header)
+    default = weights.get('*', 0.0)
+    chosen, best = None, 0.0
+    for coding in ENCODERS:
+        quality = weights.get(coding, default)
+        if quality > best:
+            chosen, best = coding, quality
+    return chosen
+
+
+def get_threshold(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return COMPRESSION_MIN_LENGTH
+    return COMPRESSION_THRESHOLDS.get(
+        match.url_name, COMPRESSION_MIN_LENGTH
+    )
+
+
+class CompressionMiddleware:
+    # В отличие от GZipMiddleware выбирает лучший кодек из принятых
+    # клиентом и учитывает порог конкретного маршрута. Сжимает только
+    # JSON под /api/ и не трогает ответы, в которые попал CSRF-токен;
+    # потоковые ответы, картинки и выгрузки файлов не трогает тоже.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (response.streaming or response.has_header('Content-Encoding')
+                or not request.path.startswith(COMPRESSIBLE_PATH)
+                or request.META.get('CSRF_COOKIE_USED')
+                or not response.get('Content-Type', '').startswith(
+                    COMPRESSIBLE_TYPES)):
+            return response
+        threshold = get_threshold(request)
+        if threshold is None:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < threshold:
+            return response
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+        compressed = ENCODERS[encoding](response.content)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
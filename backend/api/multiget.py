@@ -0,0 +1,30 @@
+from rest_framework.exceptions import ValidationError
+
+from api.constants import MULTI_GET_LIMIT, MULTI_GET_PARAM
+from api.fieldsets import split_names
+
+
+def get_requested_ids(request):
+    # None — параметр не передан и отдаётся обычная страница.
+    if MULTI_GET_PARAM not in request.query_params:
+        return None
+    names = split_names(request.query_params.getlist(MULTI_GET_PARAM))
+    if not names or not all(name.isdigit() for name in names):
+        raise ValidationError(
+            {MULTI_GET_PARAM: 'Передайте id объектов через запятую.'}
+        )
+    ids = list(dict.fromkeys(int(name) for name in names))
+    if len(ids) > MULTI_GET_LIMIT:
+        raise ValidationError(
+            {MULTI_GET_PARAM: f'Не больше {MULTI_GET_LIMIT} id за запрос.'}
+        )
+    return ids
+
+
+def get_multi_get_data(ids, results):
+    # results уже идут в порядке ids, ненайденные id перечисляются отдельно.
+    found = {item['id'] for item in results}
+    return {
+        'results': results,
+        'missing': [pk for pk in ids if pk not in found],
+    }
@@ -1,6 +1,143 @@
+import json
+
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, InvalidPage, Paginator
+from django.db import connections
+from django.utils.translation import gettext as _
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+from api.cache import get_count_cache_key
+from api.constants import (COUNT_CACHE_TIMEOUT, COUNT_EXACT_LIMIT,
+                           COUNT_IGNORED_PARAMS)
+
+
+def estimate_count(queryset):
+    # Оценка планировщика PostgreSQL по статистике таблиц, без чтения строк.
+    compiler = queryset.query.get_compiler(queryset.db)
+    sql, params = compiler.as_sql()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_objects(queryset, approximate):
+    if approximate and connections[queryset.db].vendor == 'postgresql':
+        estimate = estimate_count(queryset)
+        if estimate > COUNT_EXACT_LIMIT:
+            return estimate, False
+    return queryset.count(), True
+
+
+class CountedPaginator(Paginator):
+    # Число объектов приходит снаружи — из кеша или оценки планировщика —
+    # и может устареть, поэтому ни номер страницы, ни срез по нему не
+    # ограничиваются. Страница читается с одной лишней строкой: конец
+    # выборки даёт точное число, лишняя строка — нижнюю границу.
+
+    def __init__(self, object_list, per_page, count, exact):
+        super().__init__(object_list, per_page)
+        self.count = count
+        self.exact = exact
+        self.corrected = False
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            if self.count <= bottom + self.per_page:
+                self.correct(bottom + self.per_page + 1, False)
+        elif rows or number == 1:
+            if (self.count, self.exact) != (bottom + len(rows), True):
+                self.correct(bottom + len(rows), True)
+        else:
+            raise EmptyPage(_('That page contains no results'))
+        return self._get_page(rows, number, self)
+
+    def correct(self, count, exact):
+        self.count = count
+        self.exact = exact
+        self.corrected = True
+        self.__dict__.pop('num_pages', None)
 
 
 class PagePagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+
+    def get_count(self, queryset, request, view=None):
+        # Число объектов кешируется по нормализованным параметрам и
+        # версиям данных, поэтому повторные страницы не платят COUNT(*).
+        # View может добавить свои пространства имён в count_namespaces.
+        namespaces = getattr(view, 'count_namespaces', {}).get(
+            getattr(view, 'action', None), ()
+        )
+        self.count_cache_key = get_count_cache_key(
+            request, COUNT_IGNORED_PARAMS + (
+                self.page_query_param, self.page_size_query_param
+            ), namespaces
+        )
+        cached = cache.get(self.count_cache_key)
+        if cached is None:
+            cached = count_objects(
+                queryset, approximate=not request.user.is_authenticated
+            )
+            cache.set(self.count_cache_key, cached, COUNT_CACHE_TIMEOUT)
+        return cached
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        count, self.count_exact = self.get_count(queryset, request, view)
+        paginator = CountedPaginator(
+            queryset, page_size, count, self.count_exact
+        )
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+        self.count_exact = paginator.exact
+        if paginator.corrected:
+            cache.set(
+                self.count_cache_key, (paginator.count, paginator.exact),
+                COUNT_CACHE_TIMEOUT
+            )
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.page.paginator.count,
+            'count_exact': self.count_exact,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response = super().get_paginated_response_schema(schema)
+        response['properties']['count_exact'] = {
+            'type': 'boolean',
+            'example': True,
+        }
+        return response
@@ -0,0 +1,138 @@
+from collections import defaultdict
+
+from api.fieldsets import select_fields
+from recipes.models import (Favorite, Recipe, RecipeIngredient, RecipeTag,
+                            ShoppingCart)
+from users.models import Follow, User
+
+AUTHOR_FIELDS = (
+    'email', 'id', 'username', 'first_name', 'last_name', 'is_subscribed',
+    'avatar',
+)
+# Поля ответа в порядке RecipeSerializer и их вложенные поля.
+RECIPE_FIELDSET = {
+    'id': (),
+    'tags': (),
+    'author': AUTHOR_FIELDS,
+    'ingredients': (),
+    'is_favorited': (),
+    'is_in_shopping_cart': (),
+    'name': (),
+    'image': (),
+    'text': (),
+    'cooking_time': (),
+    'views': (),
+}
+RECIPE_COLUMNS = ('name', 'image', 'text', 'cooking_time', 'views')
+AUTHOR_COLUMNS = ('email', 'username', 'first_name', 'last_name', 'avatar')
+
+
+def file_url(storage, name, request):
+    # Повторяет FileField.to_representation из DRF без создания FieldFile.
+    if not name:
+        return None
+    url = storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def read_recipes(recipe_ids, request=None, fieldset=None):
+    # Собирает то же представление, что и RecipeSerializer, из плоских
+    # строк values(): на страницу уходит фиксированное число запросов,
+    # а модели Recipe, User, Tag и Ingredient не создаются. Запросы и
+    # столбцы для полей, которых нет в fieldset, не выполняются.
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return []
+    full = fieldset is None
+    if full:
+        fieldset = RECIPE_FIELDSET
+    author_fields = fieldset.get('author', ())
+    user = getattr(request, 'user', None)
+    if user is not None and not user.is_authenticated:
+        user = None
+    columns = ['id', 'author_id'] + [
+        name for name in RECIPE_COLUMNS if name in fieldset
+    ] + [
+        f'author__{name}' for name in AUTHOR_COLUMNS if name in author_fields
+    ]
+    rows = {
+        row['id']: row
+        for row in Recipe.objects.filter(pk__in=recipe_ids)
+        .values(*columns).order_by()
+    }
+    tags = defaultdict(list)
+    if 'tags' in fieldset:
+        for recipe_id, tag_id, name, slug in (
+                RecipeTag.objects.filter(recipe__in=recipe_ids)
+                .values_list('recipe', 'tag', 'tag__name', 'tag__slug')
+                .order_by('tag')):
+            tags[recipe_id].append(
+                {'id': tag_id, 'name': name, 'slug': slug}
+            )
+    ingredients = defaultdict(list)
+    if 'ingredients' in fieldset:
+        for recipe_id, ingredient_id, name, unit, amount in (
+                RecipeIngredient.objects.filter(recipe__in=recipe_ids)
+                .values_list(
+                    'recipe', 'ingredient', 'ingredient__name',
+                    'ingredient__measurement_unit', 'amount'
+                ).order_by('id')):
+            ingredients[recipe_id].append({
+                'id': ingredient_id,
+                'name': name,
+                'measurement_unit': unit,
+                'amount': amount,
+            })
+    subscribed = favorited = in_cart = set()
+    if user is not None and 'is_subscribed' in author_fields:
+        subscribed = set(
+            Follow.objects.filter(
+                user=user,
+                following__in={row['author_id'] for row in rows.values()}
+            ).values_list('following', flat=True)
+        )
+    if user is not None and 'is_favorited' in fieldset:
+        favorited = set(
+            Favorite.objects.filter(user=user, recipe__in=recipe_ids)
+            .values_list('recipe', flat=True)
+        )
+    if user is not None and 'is_in_shopping_cart' in fieldset:
+        in_cart = set(
+            ShoppingCart.objects.filter(user=user, recipe__in=recipe_ids)
+            .values_list('recipe', flat=True)
+        )
+    image_storage = Recipe._meta.get_field('image').storage
+    avatar_storage = User._meta.get_field('avatar').storage
+    recipes = []
+    for recipe_id in recipe_ids:
+        row = rows.get(recipe_id)
+        if row is None:
+            continue
+        author_id = row['author_id']
+        recipe = {
+            'id': recipe_id,
+            'tags': tags[recipe_id],
+            'author': {
+                'email': row.get('author__email'),
+                'id': author_id,
+                'username': row.get('author__username'),
+                'first_name': row.get('author__first_name'),
+                'last_name': row.get('author__last_name'),
+                'is_subscribed': author_id in subscribed,
+                'avatar': file_url(
+                    avatar_storage, row.get('author__avatar'), request
+                ),
+            },
+            'ingredients': ingredients[recipe_id],
+            'is_favorited': recipe_id in favorited,
+            'is_in_shopping_cart': recipe_id in in_cart,
+            'name': row.get('name'),
+            'image': file_url(image_storage, row.get('image'), request),
+            'text': row.get('text'),
+            'cooking_time': row.get('cooking_time'),
+            'views': row.get('views'),
+        }
+        recipes.append(recipe if full else select_fields(recipe, fieldset))
+    return recipes
@@ -2,8 +2,10 @@ from django.contrib.auth import get_user_model
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
-from api.constants import MIN_AMOUNT
+from api.constants import MAX_BATCH_RECIPES, MIN_AMOUNT
+from api.fieldsets import apply_fieldset
 from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.shopping_list import recipe_ingredients_changed
 from users.models import Follow
 
 User = get_user_model()
@@ -34,7 +36,18 @@ class UserCreateSerializer(serializers.ModelSerializer):
         return user
 
 
-class UserSerializer(serializers.ModelSerializer):
+class FieldsetMixin:
+    # Оставляет в ответе только поля из context['fieldset']
+    # (см. api.fieldsets.get_fieldset).
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fieldset = self.context.get('fieldset')
+        if fieldset is not None:
+            apply_fieldset(self, fieldset)
+
+
+class UserSerializer(FieldsetMixin, serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField(read_only=True)
     avatar = Base64ImageField(required=False, allow_null=True)
 
@@ -46,6 +59,9 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            # Аннотация из UserViewset.get_users.
+            return obj.is_subscribed
         request = self.context.get('request')
         if (request
                 and request.user.is_authenticated
@@ -125,7 +141,7 @@ class AddIngredientInRecipeSerializer(serializers.ModelSerializer):
         return amount
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(FieldsetMixin, serializers.ModelSerializer):
     tags = TagSerializer(
         many=True, read_only=True
     )
@@ -142,8 +158,9 @@ class RecipeSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'tags', 'author', 'ingredients',
             'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time',
+            'name', 'image', 'text', 'cooking_time', 'views',
         )
+        read_only_fields = ('views',)
 
     def get_is_favorited(self, obj):
         request = self.context.get('request')
@@ -179,6 +196,28 @@ class EasyRecipeSerializer(serializers.ModelSerializer):
         read_only_fields = '__all__',
 
 
+class RecipeBatchSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BATCH_RECIPES
+    )
+
+    def validate_recipes(self, recipe_ids):
+        recipe_ids = list(dict.fromkeys(recipe_ids))
+        recipes = Recipe.objects.only(
+            *EasyRecipeSerializer.Meta.fields
+        ).in_bulk(recipe_ids)
+        missing = [
+            recipe_id for recipe_id in recipe_ids if recipe_id not in recipes
+        ]
+        if missing:
+            raise serializers.ValidationError(
+                f'Рецепты не найдены: {", ".join(map(str, missing))}'
+            )
+        return [recipes[recipe_id] for recipe_id in recipe_ids]
+
+
 class CreateRecipeSerializer(serializers.ModelSerializer):
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
@@ -241,6 +280,9 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
                 recipe=recipe
             ) for ingredient in ingredients]
         )
+        recipe_ingredients_changed(
+            recipe.pk, [ingredient.get('id').pk for ingredient in ingredients]
+        )
         recipe.tags.set(tags, clear=True)
 
     def create(self, validated_data):
@@ -290,6 +332,8 @@ class SubscriptionShowSerializer(UserSerializer):
         return []
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return obj.recipes.count()
 
 
@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from backend.invalidation import invalidate
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            RecipeTag, ShoppingCart, Tag)
+from users.models import Follow
+
+User = get_user_model()
+
+# Пространства имён, версии которых поднимает изменение модели.
+# Шаблоны подставляют поля объекта, чтобы личные данные пользователя
+# устаревали, не задевая кеши остальных.
+NAMESPACES = {
+    Recipe: ('catalog', 'recipes'),
+    RecipeIngredient: ('catalog', 'recipes'),
+    RecipeTag: ('catalog', 'recipes'),
+    Tag: ('catalog', 'tags'),
+    Ingredient: ('catalog', 'ingredients'),
+    User: ('catalog', 'users', 'user:{id}'),
+    Follow: ('follows', 'user:{user_id}', 'follows:{user_id}'),
+    Favorite: ('favorites', 'user:{user_id}'),
+    ShoppingCart: ('carts', 'user:{user_id}'),
+}
+
+
+def get_namespaces(model, instance):
+    return [
+        template.format(**vars(instance)) if '{' in template else template
+        for template in NAMESPACES[model]
+    ]
+
+
+def model_changed(sender, instance, update_fields=None, **kwargs):
+    # Вход в админку обновляет только last_login, кеши от этого
+    # не устаревают.
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    invalidate(*get_namespaces(sender, instance))
+
+
+def relation_changed(sender, action, **kwargs):
+    # Для m2m instance — это рецепт, а не строка связи, поэтому
+    # используются только пространства без подстановок.
+    if action.startswith('post_'):
+        invalidate(*(
+            namespace for namespace in NAMESPACES[sender]
+            if '{' not in namespace
+        ))
+
+
+for model in NAMESPACES:
+    post_save.connect(model_changed, sender=model)
+    post_delete.connect(model_changed, sender=model)
+m2m_changed.connect(relation_changed, sender=RecipeTag)
+m2m_changed.connect(relation_changed, sender=RecipeIngredient)
@@ -0,0 +1,159 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from api.constants import (MULTI_GET_LIMIT, MULTI_GET_PARAM,
+                           THROTTLE_BODY_COST_BYTES, THROTTLE_BUCKETS,
+                           THROTTLE_DEFAULT_COST, THROTTLE_PROBE,
+                           THROTTLE_SLOTS)
+from api.fieldsets import split_names
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Слот: 8 байт хеша ключа, остаток токенов и время последнего обновления.
+RECORD = struct.Struct('<Qdd')
+
+
+class TokenBucketStore:
+    # Таблица вёдер лежит в файле, отображённом в память всеми
+    # процессами gunicorn на машине. Ключ хешируется в слот, коллизии
+    # решаются линейным пробированием в окне THROTTLE_PROBE, при нехватке
+    # места вытесняется давно не обновлявшееся ведро. Окно блокируется
+    # через lockf, поэтому процессы не мешают друг другу на разных ключах.
+
+    def __init__(self, path, slots=THROTTLE_SLOTS, probe=THROTTLE_PROBE):
+        self.path = path
+        self.slots = slots
+        self.probe = probe
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def open(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        size = self.slots * RECORD.size
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self.fd).st_size < size:
+            os.ftruncate(self.fd, size)
+        self.map = mmap.mmap(self.fd, size)
+        self.pid = os.getpid()
+
+    def consume(self, key, cost, capacity, period, now=None, peek=False):
+        # Возвращает 0, если токены списаны, иначе сколько секунд ждать.
+        # С peek=True только проверяет, хватает ли токенов, и ничего
+        # не записывает.
+        now = time.time() if now is None else now
+        rate = capacity / period
+        cost = min(cost, capacity)
+        digest = int.from_bytes(
+            hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little'
+        ) or 1
+        start = digest % (self.slots - self.probe) * RECORD.size
+        with self.lock:
+            if self.pid != os.getpid():
+                self.open()
+            if fcntl is not None:
+                fcntl.lockf(
+                    self.fd, fcntl.LOCK_EX,
+                    self.probe * RECORD.size, start, os.SEEK_SET
+                )
+            try:
+                offset, tokens, updated = self.find(start, digest)
+                if updated is None:
+                    tokens = capacity
+                else:
+                    tokens = min(
+                        capacity, tokens + max(now - updated, 0) * rate
+                    )
+                if tokens >= cost:
+                    tokens -= cost
+                    wait = 0.0
+                else:
+                    wait = (cost - tokens) / rate
+                if not peek:
+                    RECORD.pack_into(self.map, offset, digest, tokens, now)
+            finally:
+                if fcntl is not None:
+                    fcntl.lockf(
+                        self.fd, fcntl.LOCK_UN,
+                        self.probe * RECORD.size, start, os.SEEK_SET
+                    )
+        return wait
+
+    def find(self, start, digest):
+        free = oldest = None
+        for offset in range(start, start + self.probe * RECORD.size,
+                            RECORD.size):
+            stored, tokens, updated = RECORD.unpack_from(self.map, offset)
+            if stored == digest:
+                return offset, tokens, updated
+            if stored == 0 and free is None:
+                free = offset
+            if oldest is None or updated < oldest[1]:
+                oldest = (offset, updated)
+        return (oldest[0] if free is None else free), None, None
+
+
+store = TokenBucketStore(settings.THROTTLE_STORE)
+
+
+class CostThrottle(BaseThrottle):
+    # Запрос списывает токены из ведра пользователя (или анонимного IP)
+    # и из общего ведра IP. Стоимость задаётся во view словарём
+    # throttle_costs по имени action, растёт с ?limit=, числом ?ids=
+    # и размером тела. Хранилище — файл в памяти, запросов к БД проверка
+    # не делает.
+
+    def allow_request(self, request, view):
+        if not settings.THROTTLE_ENABLED:
+            return True
+        cost = self.get_cost(request, view)
+        ident = self.get_ident(request)
+        if request.user.is_authenticated:
+            buckets = (
+                ('user', f'user:{request.user.pk}'), ('ip', f'ip:{ident}')
+            )
+        else:
+            buckets = (('anon', f'anon:{ident}'),)
+        # Токены списываются, только если их хватает во всех вёдрах:
+        # отклонённый запрос пользователя не тратит ведро IP, и наоборот.
+        self.delay = max(
+            store.consume(key, cost, *THROTTLE_BUCKETS[scope], peek=True)
+            for scope, key in buckets
+        )
+        if self.delay:
+            return False
+        for scope, key in buckets:
+            store.consume(key, cost, *THROTTLE_BUCKETS[scope])
+        return True
+
+    def get_cost(self, request, view):
+        cost = getattr(view, 'throttle_costs', {}).get(
+            getattr(view, 'action', None), THROTTLE_DEFAULT_COST
+        )
+        paginator = getattr(view, 'paginator', None)
+        limit = request.query_params.get(
+            getattr(paginator, 'page_size_query_param', None) or ''
+        )
+        if limit and limit.isdigit() and paginator.page_size:
+            cost *= max(1, math.ceil(int(limit) / paginator.page_size))
+        ids = split_names(request.query_params.getlist(MULTI_GET_PARAM))
+        if ids and getattr(paginator, 'page_size', None):
+            requested = min(len(ids), MULTI_GET_LIMIT)
+            cost *= max(1, math.ceil(requested / paginator.page_size))
+        length = request.META.get('CONTENT_LENGTH')
+        if length and length.isdigit():
+            cost += int(length) // THROTTLE_BODY_COST_BYTES
+        return cost
+
+    def wait(self):
+        return self.delay
@@ -1,44 +1,126 @@
-from django.db.models import Sum
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, OuterRef
 from django.http import HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import status, viewsets
+from rest_framework import generics, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.filters import SearchFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
 from rest_framework.viewsets import ModelViewSet
 
-from api.constants import FILENAME_SHOPPING_LIST
+from api.cache import (anonymous_pages, get_cached_list, get_page_cache_key,
+                       ingredients_cache, tags_cache)
+from api.constants import (ANONYMOUS_PAGE_CACHE_TIMEOUT, FIELDSET_PARAM,
+                           FILENAME_SHOPPING_LIST, OMIT_PARAM)
+from api.events import issue_ticket
+from api.fieldsets import get_columns, get_fieldset
 from api.filters import RecipeFilter
+from api.multiget import get_multi_get_data, get_requested_ids
 from api.pagination import PagePagination
 from api.permission import IsAuthorOrAuthenticatedOrRead
+from api.readers import RECIPE_FIELDSET, read_recipes
 from api.serializer import (CreateRecipeSerializer, EasyRecipeSerializer,
                             IngredientSerializer, PasswordChangeSerializer,
-                            RecipeSerializer, SubscriptionCreateSerializer,
+                            RecipeBatchSerializer, RecipeSerializer,
+                            SubscriptionCreateSerializer,
                             SubscriptionShowSerializer, TagSerializer, User,
                             UserCreateSerializer, UserSerializer)
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from api.signals import get_namespaces
+from backend.invalidation import invalidate
+from recipes.constants import SIMILAR_RECIPES_COUNT
+from recipes.feed import get_feed
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeNeighbour,
+                            ShoppingCart, ShoppingListItem, Tag)
+from recipes.recommendations import get_recommendations
+from recipes.shopping_list import cart_changed
+from recipes.view_counts import record_view
 from users.models import Follow
 
 
 class UserViewset(ModelViewSet):
     queryset = User.objects.all()
     pagination_class = PagePagination
+    throttle_costs = {
+        'create': 5,
+        'avatar': 5,
+        'set_password': 5,
+        'subscriptions': 3,
+    }
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return UserCreateSerializer
         return UserSerializer
 
+    def get_fieldset(self, serializer_class):
+        if self.request.method != 'GET':
+            return None
+        return get_fieldset(
+            self.request, dict.fromkeys(serializer_class.Meta.fields, ())
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fieldset'] = self.get_fieldset(self.get_serializer_class())
+        return context
+
+    def get_queryset(self):
+        return self.get_users(super().get_queryset(), UserSerializer)
+
+    def get_users(self, queryset, serializer_class):
+        # Столбцы и аннотации берутся только для полей из ответа.
+        fieldset = self.get_fieldset(serializer_class)
+        if fieldset is None:
+            fieldset = serializer_class.Meta.fields
+        if self.request.method == 'GET':
+            queryset = queryset.only('id', *get_columns(User, fieldset))
+        if 'is_subscribed' in fieldset and self.request.user.is_authenticated:
+            queryset = queryset.annotate(is_subscribed=Exists(
+                Follow.objects.filter(
+                    user=self.request.user, following=OuterRef('pk')
+                )
+            ))
+        if 'recipes_count' in fieldset:
+            queryset = queryset.annotate(
+                recipes_count=Count('recipes', distinct=True)
+            )
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        ids = get_requested_ids(request)
+        if ids is None:
+            return super().list(request, *args, **kwargs)
+        users = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+            [users[pk] for pk in ids if pk in users], many=True
+        )
+        return Response(get_multi_get_data(ids, serializer.data))
+
     @action(
         detail=False, methods=('get',),
         permission_classes=[IsAuthenticated])
     def me(self, request):
-        serializer = UserSerializer(request.user)
+        serializer = UserSerializer(request.user, context={
+            'fieldset': self.get_fieldset(UserSerializer),
+        })
         return Response(serializer.data)
 
+    @action(
+        detail=False, methods=('post',),
+        permission_classes=[IsAuthenticated],
+        url_path='me/events-ticket'
+    )
+    def events_ticket(self, request):
+        return Response(
+            {'ticket': issue_ticket(request.user.pk)},
+            status=status.HTTP_201_CREATED
+        )
+
     @action(
         detail=False, methods=('put',),
         permission_classes=[IsAuthenticated],
@@ -74,13 +156,17 @@ class UserViewset(ModelViewSet):
     @action(methods=('get',), detail=False,
             permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
-        subs_list = User.objects.filter(
-            following__in=request.user.follower.all()
+        subs_list = self.get_users(
+            User.objects.filter(following__in=request.user.follower.all()),
+            SubscriptionShowSerializer
         )
         serializer = SubscriptionShowSerializer(
             self.paginate_queryset(subs_list),
             many=True,
-            context={'request': request}
+            context={
+                'request': request,
+                'fieldset': self.get_fieldset(SubscriptionShowSerializer),
+            }
         )
         return self.get_paginated_response(serializer.data)
 
@@ -119,6 +205,9 @@ class TagViewset(viewsets.ReadOnlyModelViewSet):
     serializer_class = TagSerializer
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return Response(get_cached_list(tags_cache, self))
+
 
 class IngredientViewset(viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
@@ -126,6 +215,12 @@ class IngredientViewset(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
     filter_backends = [SearchFilter, ]
     search_fields = ['^name']
+    throttle_costs = {'list': 3}
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        return Response(get_cached_list(ingredients_cache, self))
 
 
 class RecipeViewSet(ModelViewSet):
@@ -141,6 +236,23 @@ class RecipeViewSet(ModelViewSet):
     ]
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    throttle_costs = {
+        'create': 10,
+        'partial_update': 10,
+        'destroy': 3,
+        'feed': 2,
+        'similar': 2,
+        'recommended': 2,
+        'shopping_cart_batch': 5,
+        'shopping_cart_batch_delete': 5,
+        'favorite_batch': 5,
+        'favorite_batch_delete': 5,
+        'download_shopping_cart': 20,
+    }
+    # Пересчёт рекомендаций меняет их сразу у всех пользователей.
+    count_namespaces = {
+        'recommended': ('recommendations',),
+    }
 
     def get_serializer_class(self):
         if self.request.method in ['POST', 'PATCH']:
@@ -150,6 +262,115 @@ class RecipeViewSet(ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def get_recipe_ids(self, queryset):
+        return queryset.prefetch_related(None).values_list('id', flat=True)
+
+    def get_fieldset(self):
+        return get_fieldset(self.request, RECIPE_FIELDSET)
+
+    def read_page(self, queryset):
+        fieldset = self.get_fieldset()
+        recipe_ids = self.get_recipe_ids(queryset)
+        page = self.paginate_queryset(recipe_ids)
+        if page is None:
+            return Response(read_recipes(recipe_ids, self.request, fieldset))
+        return self.get_paginated_response(
+            read_recipes(page, self.request, fieldset)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        fieldset = self.get_fieldset()
+        recipe_id = generics.get_object_or_404(
+            self.get_recipe_ids(self.filter_queryset(self.get_queryset())),
+            pk=kwargs[self.lookup_field]
+        )
+        record_view(recipe_id, self.get_viewer(request))
+        return Response(read_recipes([recipe_id], request, fieldset)[0])
+
+    def get_viewer(self, request):
+        if request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{BaseThrottle().get_ident(request)}'
+
+    def list(self, request, *args, **kwargs):
+        ids = get_requested_ids(request)
+        if ids is not None:
+            # Те же запросы, что и для страницы списка, без фильтров
+            # и пагинации.
+            return Response(get_multi_get_data(
+                ids, read_recipes(ids, request, self.get_fieldset())
+            ))
+        if (not request.user.is_anonymous
+                or request.accepted_renderer.format != 'json'):
+            return self.read_page(self.filter_queryset(self.get_queryset()))
+        # Сначала страница ищется в памяти воркера, затем в общем кеше.
+        key = get_page_cache_key(request, self.get_page_cache_params())
+        cached = anonymous_pages.get(key)
+        if cached is None:
+            cached = cache.get(key)
+            if cached is not None:
+                anonymous_pages.set(key, cached)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        response = self.read_page(self.filter_queryset(self.get_queryset()))
+        response.add_post_render_callback(
+            lambda rendered: self.cache_page(key, rendered)
+        )
+        return response
+
+    def cache_page(self, key, response):
+        cached = (response.content, response['Content-Type'])
+        cache.set(key, cached, ANONYMOUS_PAGE_CACHE_TIMEOUT)
+        anonymous_pages.set(key, cached)
+
+    def get_page_cache_params(self):
+        return set(self.filterset_class.base_filters) | {
+            self.paginator.page_query_param,
+            self.paginator.page_size_query_param,
+            FIELDSET_PARAM,
+            OMIT_PARAM,
+        }
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if self.action == 'list' and response.status_code == 200:
+            patch_vary_headers(response, ('Authorization',))
+            if request.user.is_anonymous:
+                patch_cache_control(
+                    response, public=True,
+                    max_age=ANONYMOUS_PAGE_CACHE_TIMEOUT
+                )
+            else:
+                patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        return self.read_page(get_feed(request.user))
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated])
+    def recommended(self, request):
+        return self.read_page(get_recommendations(request.user))
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk):
+        # Соседи считаются заранее командой refresh_similar.
+        fieldset = self.get_fieldset()
+        recipe_id = generics.get_object_or_404(
+            self.get_recipe_ids(self.get_queryset()), pk=pk
+        )
+        neighbour_ids = RecipeNeighbour.objects.filter(
+            recipe=recipe_id
+        ).order_by('-score', 'neighbour').values_list(
+            'neighbour', flat=True
+        )[:SIMILAR_RECIPES_COUNT]
+        return Response(read_recipes(neighbour_ids, request, fieldset))
+
     @action(detail=True, methods=['get'],
             url_path='get-link')
     def get_link(self, request, pk):
@@ -169,16 +390,17 @@ class RecipeViewSet(ModelViewSet):
         )
 
     def shop_favorite_post(self, model, request, pk):
-        user = request.user
-        recipe = get_object_or_404(Recipe, pk=pk)
-        if model.objects.filter(
-            user=user, recipe=recipe
-        ).exists():
+        recipe = get_object_or_404(
+            Recipe.objects.only(*EasyRecipeSerializer.Meta.fields), pk=pk
+        )
+        try:
+            with transaction.atomic():
+                model.objects.create(user=request.user, recipe=recipe)
+        except IntegrityError:
             return Response(
                 {'errors': f'Этот рецепт есть в {model._meta.verbose_name}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        model.objects.create(user=user, recipe=recipe)
         serializer = EasyRecipeSerializer(recipe)
         return Response(
             serializer.data,
@@ -186,22 +408,59 @@ class RecipeViewSet(ModelViewSet):
         )
 
     def shop_favorite_delete(self, model, request, pk):
-        user = request.user
-        recipe = get_object_or_404(Recipe, pk=pk)
-        if not model.objects.filter(
-            user=user, recipe=recipe
-        ).exists():
+        deletes_count, _ = model.objects.filter(
+            user=request.user, recipe_id=pk
+        ).delete()
+        if not deletes_count:
+            get_object_or_404(Recipe, pk=pk)
             return Response(
                 {'errors': f'Этого рецепта нет в {model._meta.verbose_name}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        model.objects.get(
-            user=user, recipe=recipe
-        ).delete()
         return Response(
             status=status.HTTP_204_NO_CONTENT
         )
 
+    def invalidate_user_set(self, model, user):
+        # bulk_create не шлёт post_save, а удаление queryset может пройти
+        # без post_delete: версии личных данных поднимаются явно.
+        invalidate(*get_namespaces(model, model(user_id=user.pk)))
+
+    def shop_favorite_batch_post(self, model, request):
+        serializer = RecipeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.validated_data['recipes']
+        with transaction.atomic():
+            model.objects.bulk_create(
+                [model(user=request.user, recipe=recipe)
+                 for recipe in recipes],
+                ignore_conflicts=True
+            )
+            if model is ShoppingCart:
+                for recipe in recipes:
+                    cart_changed(request.user.pk, recipe.pk)
+            self.invalidate_user_set(model, request.user)
+        return Response(
+            EasyRecipeSerializer(recipes, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    def shop_favorite_batch_delete(self, model, request):
+        serializer = RecipeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            deletes_count, _ = model.objects.filter(
+                user=request.user,
+                recipe__in=serializer.validated_data['recipes']
+            ).delete()
+            self.invalidate_user_set(model, request.user)
+        if not deletes_count:
+            return Response(
+                {'errors': f'Этих рецептов нет в {model._meta.verbose_name}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(detail=True, methods=['post', ],
             permission_classes=[IsAuthenticated])
     def shopping_cart(self, request, pk):
@@ -211,18 +470,27 @@ class RecipeViewSet(ModelViewSet):
     def shopping_cart_delete(self, request, pk):
         return self.shop_favorite_delete(ShoppingCart, request, pk)
 
+    @action(detail=False, methods=['post', ],
+            permission_classes=[IsAuthenticated],
+            url_path='shopping_cart')
+    def shopping_cart_batch(self, request):
+        return self.shop_favorite_batch_post(ShoppingCart, request)
+
+    @shopping_cart_batch.mapping.delete
+    def shopping_cart_batch_delete(self, request):
+        return self.shop_favorite_batch_delete(ShoppingCart, request)
+
     @action(
         detail=False, methods=['get'],
         permission_classes=[IsAuthenticated, ])
     def download_shopping_cart(self, request):
         ingredients = (
-            RecipeIngredient.objects.filter(
-                recipe__shopping_cart__user=request.user
+            ShoppingListItem.objects.filter(
+                user=request.user
             ).values(
                 'ingredient__name',
-                'ingredient__measurement_unit'
-            ).annotate(
-                total_amount=Sum('amount')
+                'ingredient__measurement_unit',
+                'total_amount',
             ).order_by(
                 'ingredient__name',
                 'ingredient__measurement_unit',
@@ -251,3 +519,13 @@ class RecipeViewSet(ModelViewSet):
     @favorite.mapping.delete
     def favorite_delete(self, request, pk):
         return self.shop_favorite_delete(Favorite, request, pk)
+
+    @action(detail=False, methods=['post', ],
+            permission_classes=[IsAuthenticated],
+            url_path='favorite')
+    def favorite_batch(self, request):
+        return self.shop_favorite_batch_post(Favorite, request)
+
+    @favorite_batch.mapping.delete
+    def favorite_batch_delete(self, request):
+        return self.shop_favorite_batch_delete(Favorite, request)
@@ -13,4 +13,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Модели можно импортировать только после настройки Django.
+from api.constants import SSE_PATH  # noqa: E402
+from api.events import events_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # Поток событий держит соединение часами и обслуживается без Django:
+    # тысячи открытых потоков не занимают потоков исполнителя.
+    if scope['type'] == 'http' and scope['path'] == SSE_PATH:
+        return await events_application(scope, receive, send)
+    return await django_application(scope, receive, send)
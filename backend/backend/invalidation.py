@@ -0,0 +1,180 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from threading import local
+
+from django.conf import settings
+from django.db import transaction
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Слот: текущая версия пространства имён.
+SLOT = struct.Struct('<Q')
+# 8 МБ файла на миллион слотов: пространств user:<id> столько же,
+# сколько пользователей, и на каждое отдельного ключа не заводится.
+VERSION_SLOTS = 1 << 20
+LOCAL_CACHE_MAX_ENTRIES = 1_000
+
+_pending = local()
+
+
+class VersionStore:
+    # Версии лежат в файле, отображённом в память всеми процессами
+    # машины: воркерами gunicorn, фоновыми задачами и сервисом событий
+    # (файл на общем томе). Пространство хешируется в слот без
+    # пробирования: пространства одного слота устаревают вместе — лишняя
+    # инвалидация безопасна, пропущенная нет. Чтение — обращение к
+    # памяти, подъём версии — запись восьми байт под lockf слота.
+
+    def __init__(self, path, slots=VERSION_SLOTS):
+        self.path = path
+        self.slots = slots
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def open(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        size = self.slots * SLOT.size
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self.fd).st_size < size:
+            os.ftruncate(self.fd, size)
+        self.map = mmap.mmap(self.fd, size)
+        self.pid = os.getpid()
+
+    def get_offset(self, namespace):
+        digest = hashlib.blake2b(namespace.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') % self.slots * SLOT.size
+
+    def ensure_open(self):
+        # После fork отображение открывается заново в своём процессе.
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    self.open()
+
+    def get(self, namespaces):
+        self.ensure_open()
+        versions = []
+        for namespace in namespaces:
+            offset = self.get_offset(namespace)
+            version, = SLOT.unpack_from(self.map, offset)
+            versions.append(version or self.update(offset, bump=False))
+        return tuple(versions)
+
+    def bump(self, namespace):
+        self.ensure_open()
+        return self.update(self.get_offset(namespace))
+
+    def update(self, offset, bump=True):
+        # Пустой слот получает начальное значение от времени: если файл
+        # пересоздадут, новые версии не совпадут с прежними.
+        with self.lock:
+            if fcntl is not None:
+                fcntl.lockf(
+                    self.fd, fcntl.LOCK_EX, SLOT.size, offset, os.SEEK_SET
+                )
+            try:
+                version, = SLOT.unpack_from(self.map, offset)
+                if not version:
+                    version = time.time_ns()
+                elif bump:
+                    version += 1
+                SLOT.pack_into(self.map, offset, version)
+            finally:
+                if fcntl is not None:
+                    fcntl.lockf(
+                        self.fd, fcntl.LOCK_UN, SLOT.size, offset,
+                        os.SEEK_SET
+                    )
+        return version
+
+
+store = VersionStore(settings.VERSION_STORE)
+
+
+def _get_pending():
+    if not hasattr(_pending, 'namespaces'):
+        _pending.namespaces = set()
+    return _pending.namespaces
+
+
+def get_versions(*namespaces):
+    # Версии читаются прямо из общего файла, поэтому изменение в одном
+    # процессе другие видят сразу, без опроса и рассылки.
+    return store.get(namespaces)
+
+
+def get_version(namespace):
+    return get_versions(namespace)[0]
+
+
+def publish(namespaces):
+    for namespace in namespaces:
+        store.bump(namespace)
+
+
+def flush():
+    namespaces = _get_pending()
+    if not namespaces:
+        return
+    _pending.namespaces = set()
+    publish(namespaces)
+
+
+def invalidate(*namespaces):
+    # Версии поднимаются после коммита и один раз на пространство имён,
+    # сколько бы объектов ни изменила транзакция. Вне транзакции
+    # on_commit срабатывает сразу.
+    _get_pending().update(namespaces)
+    transaction.on_commit(flush)
+
+
+class LocalCache:
+    # Кеш в памяти процесса. Запись помнит версии своих пространств имён
+    # и считается устаревшей, как только хотя бы одна из них изменилась,
+    # поэтому воркерам не нужно рассылать сообщения об очистке.
+
+    def __init__(self, namespaces, timeout=None,
+                 max_entries=LOCAL_CACHE_MAX_ENTRIES):
+        self.namespaces = tuple(namespaces)
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        versions = get_versions(*self.namespaces)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            entry_versions, expires, value = entry
+            if entry_versions != versions or (
+                    expires is not None and expires < time.monotonic()):
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        versions = get_versions(*self.namespaces)
+        expires = (
+            None if self.timeout is None
+            else time.monotonic() + self.timeout
+        )
+        with self.lock:
+            self.entries[key] = (versions, expires, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
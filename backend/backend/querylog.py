@@ -0,0 +1,294 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from threading import local
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections
+from django.db.backends.signals import connection_created
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Записи ждут фонового писателя в очереди; при переполнении
+# новые медленные запросы отбрасываются, а не тормозят запрос.
+QUEUE_SIZE = 1_000
+# Не больше стольких записей и EXPLAIN в минуту на процесс: при массовой
+# деградации базы журнал сам не становится нагрузкой.
+MAX_RECORDS_PER_MINUTE = 120
+MAX_EXPLAINS_PER_MINUTE = 10
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+SQL_MAX_LENGTH = 4_000
+PROCESS = ' '.join(os.path.basename(arg) for arg in sys.argv[:2])
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+PLACEHOLDER_ROWS = re.compile(r'\(%s, \.\.\.\)(?:\s*,\s*\(%s, \.\.\.\))+')
+WHITESPACE = re.compile(r'\s+')
+
+logger = logging.getLogger(__name__)
+journal = logging.getLogger('slow_queries')
+journal.propagate = False
+
+_state = local()
+_records = queue.Queue(QUEUE_SIZE)
+_lock = threading.Lock()
+_writer = None
+
+
+class Budget:
+    # Счётчик в окне фиксированной длины, общий для потоков процесса.
+
+    def __init__(self, limit, period=60):
+        self.limit = limit
+        self.period = period
+        self.started = time.monotonic()
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def take(self):
+        now = time.monotonic()
+        with self.lock:
+            if now - self.started >= self.period:
+                self.started, self.used = now, 0
+            if self.used >= self.limit:
+                return False
+            self.used += 1
+            return True
+
+
+_records_budget = Budget(MAX_RECORDS_PER_MINUTE)
+_explains_budget = Budget(MAX_EXPLAINS_PER_MINUTE)
+
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    # В файл пишут все воркеры gunicorn: запись и ротация идут под lockf,
+    # а файл, который повернул другой процесс, открывается заново.
+
+    def __init__(self, filename, **kwargs):
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        super().__init__(filename, delay=True, **kwargs)
+
+    def emit(self, record):
+        if fcntl is None:
+            return super().emit(record)
+        with open(f'{self.baseFilename}.lock', 'a') as lock:
+            fcntl.lockf(lock, fcntl.LOCK_EX)
+            try:
+                self.reopen_if_rotated()
+                super().emit(record)
+            finally:
+                fcntl.lockf(lock, fcntl.LOCK_UN)
+
+    def reopen_if_rotated(self):
+        if self.stream is None:
+            return
+        try:
+            current = os.stat(self.baseFilename).st_ino
+        except FileNotFoundError:
+            current = None
+        if current != os.fstat(self.stream.fileno()).st_ino:
+            self.stream.close()
+            self.stream = self._open()
+
+
+def normalize(sql):
+    # Литералы и списки параметров разной длины сводятся к одному виду,
+    # чтобы одинаковые запросы попадали в одну группу.
+    sql = STRING_LITERAL.sub('%s', sql)
+    sql = NUMBER_LITERAL.sub('%s', sql)
+    sql = PLACEHOLDER_LIST.sub('(%s, ...)', sql)
+    sql = PLACEHOLDER_ROWS.sub('(%s, ...), ...', sql)
+    return WHITESPACE.sub(' ', sql).strip()[:SQL_MAX_LENGTH]
+
+
+def get_fingerprint(sql):
+    return hashlib.sha1(sql.encode()).hexdigest()[:16]
+
+
+def get_params_shape(params, many):
+    # Значения параметров в журнал не попадают, только их типы.
+    if many:
+        return {'rows': len(params) if hasattr(params, '__len__') else None}
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {name: type(value).__name__ for name, value in params.items()}
+    types = [type(value).__name__ for value in params]
+    return {'count': len(types), 'types': sorted(set(types))}
+
+
+def find_frame():
+    # Первый кадр из кода проекта: сам Django, DRF и этот модуль пропускаются.
+    base = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(base) and filename != __file__
+                and 'site-packages' not in filename):
+            return (
+                f'{os.path.relpath(filename, base)}:{frame.f_lineno} '
+                f'in {frame.f_code.co_name}'
+            )
+        frame = frame.f_back
+    return None
+
+
+def time_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        if elapsed >= settings.SLOW_QUERY_THRESHOLD_MS:
+            sample(sql, params, many, context['connection'], elapsed)
+
+
+def sample(sql, params, many, connection, elapsed):
+    if (getattr(_state, 'paused', False)
+            or random.random() >= settings.SLOW_QUERY_SAMPLE_RATE
+            or not _records_budget.take()):
+        return
+    normalized = normalize(sql)
+    record = {
+        'time': round(time.time(), 3),
+        'duration_ms': round(elapsed, 3),
+        'fingerprint': get_fingerprint(normalized),
+        'sql': normalized,
+        'params': get_params_shape(params, many),
+        'view': getattr(_state, 'view', None) or PROCESS,
+        'frame': find_frame(),
+        'database': connection.alias,
+        'pid': os.getpid(),
+    }
+    explain = None
+    if (connection.vendor == 'postgresql' and not many
+            and normalized[:6].upper() == 'SELECT'
+            and random.random() < settings.SLOW_QUERY_EXPLAIN_RATE):
+        explain = (sql, params, connection.alias)
+    try:
+        _records.put_nowait((record, explain))
+    except queue.Full:
+        return
+    start_writer()
+
+
+def get_plan(sql, params, alias):
+    # План снимается отдельным соединением потока-писателя: транзакция
+    # запроса не затрагивается, а ошибка EXPLAIN её не прерывает.
+    with connections[alias].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan
+
+
+def write(record, explain):
+    if explain is not None and _explains_budget.take():
+        try:
+            record['plan'] = get_plan(*explain)
+        except DatabaseError as error:
+            record['plan_error'] = str(error)
+        finally:
+            close_old_connections()
+    journal.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def start_writer():
+    global _writer
+    if _writer is not None and _writer.is_alive():
+        return
+    with _lock:
+        if _writer is not None and _writer.is_alive():
+            return
+        _writer = threading.Thread(
+            target=run_writer, name='slow-queries', daemon=True
+        )
+        _writer.start()
+
+
+def run_writer():
+    # Запросы самого писателя (EXPLAIN) в журнал не пишутся.
+    _state.paused = True
+    while True:
+        record, explain = _records.get()
+        try:
+            write(record, explain)
+        except Exception:
+            logger.exception('Не удалось записать медленный запрос')
+
+
+def drain():
+    while True:
+        try:
+            record, _ = _records.get_nowait()
+        except queue.Empty:
+            return
+        journal.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def add_wrapper(sender, connection, **kwargs):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def install():
+    if not settings.SLOW_QUERY_LOG_ENABLED:
+        return
+    if not journal.handlers:
+        handler = SharedRotatingFileHandler(
+            settings.SLOW_QUERY_LOG, maxBytes=LOG_MAX_BYTES,
+            backupCount=LOG_BACKUP_COUNT, encoding='UTF-8'
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        journal.addHandler(handler)
+        journal.setLevel(logging.INFO)
+    connection_created.connect(add_wrapper, dispatch_uid=__name__)
+    for connection in connections.all():
+        if connection.connection is not None:
+            add_wrapper(None, connection)
+
+
+class QueryLogMiddleware:
+    # Запоминает для журнала, какой маршрут выполняет запросы потока.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.view = f'{request.method} {request.path}'
+        try:
+            return self.get_response(request)
+        finally:
+            _state.view = None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _state.view = f'{request.method} {request.resolver_match.view_name}'
+
+
+def reset_after_fork():
+    # Поток, очередь и счётчики мастера воркеру не достаются.
+    global _writer, _lock, _records, _records_budget, _explains_budget
+    _lock = threading.Lock()
+    _records = queue.Queue(QUEUE_SIZE)
+    _records_budget = Budget(MAX_RECORDS_PER_MINUTE)
+    _explains_budget = Budget(MAX_EXPLAINS_PER_MINUTE)
+    _writer = None
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+atexit.register(drain)
@@ -36,11 +36,14 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
+    'jobs.apps.JobsConfig',
     'django_filters',
 ]
 
 MIDDLEWARE = [
+    'backend.querylog.QueryLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -95,6 +98,34 @@ else:
         }
     }
 
+# По умолчанию кеш свой у каждого процесса: запись в него O(1), а
+# устаревание между процессами держится на общих версиях инвалидации.
+# В docker-compose кеш общий — memcached. FileBasedCache при каждой
+# записи перечисляет весь каталог и годится только для отладки.
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+)
+
+# Страницы и счётчики для анонимов, числа объектов в выборках.
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', 'default'),
+        'KEY_PREFIX': 'default',
+    },
+}
+# Клиент memcached не принимает настроек вытеснения: память ограничивает
+# сам сервер.
+if 'memcached' not in CACHE_BACKEND:
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 2_000)),
+        'CULL_FREQUENCY': int(os.getenv('CACHE_CULL_FREQUENCY', 10)),
+    }
+
+# Фоновые задачи выполняет manage.py run_workers; при JOBS_EAGER=True
+# они запускаются сразу после коммита в процессе, который их поставил.
+JOBS_EAGER = os.getenv('JOBS_EAGER', 'False') == 'True'
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -138,6 +169,7 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+DEFAULT_FILE_STORAGE = 'backend.storage.ContentAddressedStorage'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -148,5 +180,43 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.TokenAuthentication',
     ),
+    # При установленном orjson JSON собирается и разбирается через него,
+    # без него классы работают как стандартные JSONRenderer/JSONParser.
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'SEARCH_PARAM': 'name',
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.CostThrottle',
+    ),
+    # Клиентский IP берётся из X-Forwarded-For, который ставит nginx.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
 }
+
+# Версии пространств инвалидации кешей, общие для процессов машины.
+VERSION_STORE = os.getenv(
+    'VERSION_STORE', os.path.join(BASE_DIR, 'cache', 'versions.bin')
+)
+
+THROTTLE_ENABLED = os.getenv('THROTTLE_ENABLED', 'True') == 'True'
+# Вёдра ограничения частоты общие для процессов одной машины.
+THROTTLE_STORE = os.getenv(
+    'THROTTLE_STORE', os.path.join(BASE_DIR, 'cache', 'throttle.bin')
+)
+
+# Журнал медленных запросов: запросы дольше порога попадают в файл
+# с выборкой SLOW_QUERY_SAMPLE_RATE, для доли SLOW_QUERY_EXPLAIN_RATE
+# из них на PostgreSQL снимается план. Сводка — manage.py slow_queries.
+SLOW_QUERY_LOG_ENABLED = os.getenv('SLOW_QUERY_LOG_ENABLED', 'True') == 'True'
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv('SLOW_QUERY_SAMPLE_RATE', 1))
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv('SLOW_QUERY_EXPLAIN_RATE', 0.1))
+SLOW_QUERY_LOG = os.getenv(
+    'SLOW_QUERY_LOG', os.path.join(BASE_DIR, 'logs', 'slow-queries.log')
+)
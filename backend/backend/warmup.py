@@ -0,0 +1,67 @@
+import gc
+import resource
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import get_resolver
+
+# Запросы, которые проходят через весь стек: разбор URL, сериализаторы,
+# рендерер и кеши справочников тегов и ингредиентов.
+WARMUP_PATHS = (
+    '/api/tags/',
+    '/api/ingredients/',
+    '/api/recipes/?limit=1',
+    '/api/users/?limit=1',
+)
+
+
+def warm_up(paths=WARMUP_PATHS):
+    started = time.perf_counter()
+    get_resolver().reverse_dict
+    host = next(
+        (host for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost'
+    ).lstrip('.')
+    client = Client(HTTP_HOST=host)
+    statuses = {}
+    # Прогрев не должен тратить вёдра ограничителя частоты.
+    with override_settings(THROTTLE_ENABLED=False):
+        for path in paths:
+            statuses[path] = client.get(path).status_code
+    # После fork дочерние процессы не должны делить сокеты с мастером.
+    connections.close_all()
+    return time.perf_counter() - started, statuses
+
+
+def freeze():
+    # Объекты, созданные до fork, уходят из-под сборщика мусора: его
+    # обход не трогает их страницы, и они остаются общими между воркерами.
+    gc.collect()
+    gc.freeze()
+
+
+def get_memory(pid='self'):
+    # RSS и PSS в килобайтах. PSS делит общие страницы между процессами,
+    # поэтому сумма PSS воркеров показывает реальный расход памяти.
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', encoding='UTF-8') as file:
+            values = {
+                name: int(value.split()[0])
+                for name, value in (
+                    line.split(':', 1) for line in file if ':' in line
+                )
+                if name in ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty')
+            }
+    except (OSError, ValueError):
+        if pid != 'self':
+            return {}
+        return {'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    return {
+        'rss': values.get('Rss'),
+        'pss': values.get('Pss'),
+        'shared': (
+            values.get('Shared_Clean', 0) + values.get('Shared_Dirty', 0)
+        ),
+    }
@@ -0,0 +1,60 @@
+import os
+import time
+
+started = time.monotonic()
+
+bind = os.getenv('GUNICORN_BIND', '0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+# С preload приложение загружается и прогревается в мастере один раз,
+# воркеры получают его после fork и делят страницы памяти.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+warmup = os.getenv('GUNICORN_WARMUP', 'True') == 'True'
+
+
+def format_memory(memory):
+    return ', '.join(
+        f'{name.upper()} {value / 1024:.1f} МиБ'
+        for name, value in memory.items() if value is not None
+    )
+
+
+def when_ready(server):
+    if server.cfg.preload_app and warmup:
+        from backend.warmup import freeze, warm_up
+        elapsed, statuses = warm_up()
+        freeze()
+        server.log.info(
+            'Прогрев в мастере: %.0f мс, %s', elapsed * 1000, statuses
+        )
+    from backend.warmup import get_memory
+    server.log.info(
+        'Мастер готов за %.0f мс, %s',
+        (time.monotonic() - started) * 1000, format_memory(get_memory())
+    )
+
+
+def pre_fork(server, worker):
+    if server.cfg.preload_app:
+        from django.db import connections
+        connections.close_all()
+
+
+def post_fork(server, worker):
+    worker.forked = time.monotonic()
+
+
+def post_worker_init(worker):
+    from backend.warmup import get_memory, warm_up
+    if not worker.cfg.preload_app and warmup:
+        warm_up()
+    worker.log.info(
+        'Воркер %s готов за %.0f мс, %s', worker.pid,
+        (time.monotonic() - worker.forked) * 1000,
+        format_memory(get_memory())
+    )
+
+
+def worker_exit(server, worker):
+    # Просмотры рецептов, накопленные воркером, пишутся перед выходом.
+    from recipes.view_counts import flush
+    flush()
@@ -0,0 +1,17 @@
+from django.contrib import admin
+
+from jobs.models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'name', 'status', 'priority', 'attempts',
+        'run_after', 'created', 'finished',
+    )
+    list_filter = ('status',)
+    search_fields = ('^name',)
+    readonly_fields = ('locked_by', 'locked_until', 'started', 'finished',)
+    show_full_result_count = False
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,12 @@
+LIMIT_JOB_NAME = 255
+LIMIT_WORKER_NAME = 100
+
+JOB_PRIORITY = 0
+JOB_MAX_ATTEMPTS = 5
+JOB_LEASE = 5 * 60
+JOB_RETRY_DELAY = 10
+JOB_MAX_RETRY_DELAY = 60 * 60
+JOB_POLL_INTERVAL = 1.0
+JOB_CLAIM_CANDIDATES = 10
+JOB_DONE_RETENTION = 24 * 60 * 60
+JOB_STATS_INTERVAL = 60
@@ -0,0 +1,56 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.worker import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает длину очереди и пропускную способность, задержку '
+        'и время выполнения задач за последние минуты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minutes', type=int, default=60)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        since = now - timedelta(minutes=options['minutes'])
+        self.stdout.write('Очередь:')
+        for row in (Job.objects.exclude(status=Job.DONE)
+                    .values('name', 'status').annotate(count=Count('id'))
+                    .order_by('name', 'status')):
+            self.stdout.write(
+                f'  {row["name"]} [{row["status"]}]: {row["count"]}'
+            )
+        overdue = Job.objects.filter(
+            status=Job.QUEUED, run_after__lte=now
+        ).order_by('run_after').values_list('run_after', flat=True).first()
+        if overdue is not None:
+            self.stdout.write(
+                'Самая старая готовая задача ждёт '
+                f'{(now - overdue).total_seconds():.1f} с'
+            )
+        waits, durations = defaultdict(list), defaultdict(list)
+        for name, run_after, started, finished in (
+                Job.objects.filter(status=Job.DONE, finished__gte=since)
+                .values_list('name', 'run_after', 'started', 'finished')
+                .iterator()):
+            waits[name].append(max((started - run_after).total_seconds(), 0))
+            durations[name].append((finished - started).total_seconds())
+        self.stdout.write(f'Выполнено за {options["minutes"]} мин:')
+        for name in sorted(durations):
+            count = len(durations[name])
+            self.stdout.write(
+                f'  {name}: {count} '
+                f'({count / options["minutes"]:.1f}/мин), '
+                f'ожидание p50 {percentile(waits[name], 0.5):.3f} с '
+                f'p95 {percentile(waits[name], 0.95):.3f} с, '
+                f'выполнение p50 {percentile(durations[name], 0.5):.3f} с '
+                f'p95 {percentile(durations[name], 0.95):.3f} с'
+            )
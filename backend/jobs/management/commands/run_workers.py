@@ -0,0 +1,88 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.constants import (JOB_DONE_RETENTION, JOB_LEASE, JOB_POLL_INTERVAL,
+                            JOB_STATS_INTERVAL)
+from jobs.worker import Worker
+
+
+def run_worker(options, log=None):
+    worker = Worker(
+        threads=options['threads'],
+        batch_size=options['batch_size'],
+        poll_interval=options['poll_interval'],
+        lease=options['lease'],
+        stats_interval=options['stats_interval'],
+        retention=options['retention'],
+        once=options['once'],
+        log=log,
+    )
+    # По SIGTERM/SIGINT новые задачи не берутся, текущие доделываются.
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: worker.stop.set())
+    worker.run()
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает обработчики фоновых задач из таблицы jobs_job. '
+        'Каждый процесс держит пул потоков со своим подключением к БД.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument(
+            '--batch-size', type=int, default=1,
+            help='Сколько задач поток захватывает за раз.'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=JOB_POLL_INTERVAL
+        )
+        parser.add_argument(
+            '--lease', type=int, default=JOB_LEASE,
+            help='Через сколько секунд незавершённую задачу '
+                 'может забрать другой обработчик.'
+        )
+        parser.add_argument(
+            '--stats-interval', type=float, default=JOB_STATS_INTERVAL,
+            help='Как часто печатать метрики и удалять старые задачи.'
+        )
+        parser.add_argument(
+            '--retention', type=int, default=JOB_DONE_RETENTION,
+            help='Сколько секунд хранить выполненные задачи.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться.'
+        )
+
+    def handle(self, *args, **options):
+        if options['processes'] <= 1:
+            run_worker(options, self.stdout.write)
+            return
+        # Подключения не должны переживать fork: каждый процесс
+        # открывает свои.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(
+                target=run_worker, args=(options, self.stdout.write)
+            )
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+
+        def stop(*args):
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for process in processes:
+            process.join()
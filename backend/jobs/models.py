@@ -0,0 +1,98 @@
+from django.db import models
+from django.utils import timezone
+
+from jobs.constants import (JOB_MAX_ATTEMPTS, JOB_PRIORITY, LIMIT_JOB_NAME,
+                            LIMIT_WORKER_NAME)
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        max_length=LIMIT_JOB_NAME,
+        verbose_name='Функция'
+    )
+    args = models.JSONField(
+        default=list,
+        verbose_name='Аргументы'
+    )
+    priority = models.SmallIntegerField(
+        default=JOB_PRIORITY,
+        verbose_name='Приоритет'
+    )
+    status = models.CharField(
+        max_length=max(len(status) for status, _ in STATUSES),
+        choices=STATUSES,
+        default=QUEUED,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=JOB_MAX_ATTEMPTS,
+        verbose_name='Максимум попыток'
+    )
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Не раньше'
+    )
+    locked_by = models.CharField(
+        max_length=LIMIT_WORKER_NAME,
+        blank=True,
+        verbose_name='Обработчик'
+    )
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Аренда до'
+    )
+    created = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Создана'
+    )
+    started = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Начата'
+    )
+    finished = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Завершена'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(
+                fields=('status', '-priority', 'run_after'),
+                name='job_queue'
+            ),
+            models.Index(
+                fields=('status', 'locked_until'),
+                name='job_lease'
+            ),
+            models.Index(
+                fields=('status', 'finished'),
+                name='job_finished'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name}{tuple(self.args)}'
@@ -0,0 +1,123 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from jobs.constants import (JOB_CLAIM_CANDIDATES, JOB_LEASE, JOB_MAX_ATTEMPTS,
+                            JOB_MAX_RETRY_DELAY, JOB_PRIORITY, JOB_RETRY_DELAY)
+from jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+QUEUE_ORDER = ('-priority', 'run_after', 'id')
+
+
+def get_job_name(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, *args, priority=JOB_PRIORITY, delay=0,
+            max_attempts=JOB_MAX_ATTEMPTS):
+    # Задача пишется в ту же транзакцию, что и изменения, которые её
+    # породили: обработчики увидят строку только после коммита, а при
+    # откате она исчезнет вместе с ними. Аргументы должны быть JSON.
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: func(*args))
+        return None
+    return Job.objects.create(
+        name=get_job_name(func),
+        args=list(args),
+        priority=priority,
+        max_attempts=max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def available(now):
+    # Задача с истёкшей арендой считается брошенной упавшим обработчиком.
+    return (
+        Q(status=Job.QUEUED, run_after__lte=now)
+        | Q(status=Job.RUNNING, locked_until__lt=now)
+    )
+
+
+def claim(worker, limit=1, lease=JOB_LEASE):
+    now = timezone.now()
+    lock = {
+        'status': Job.RUNNING,
+        'locked_by': worker,
+        'locked_until': now + timedelta(seconds=lease),
+        'attempts': F('attempts') + 1,
+        'started': now,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                Job.objects.filter(available(now)).order_by(*QUEUE_ORDER)
+                .select_for_update(skip_locked=True)
+                .values_list('id', flat=True)[:limit]
+            )
+            Job.objects.filter(pk__in=ids).update(**lock)
+    else:
+        # Без SKIP LOCKED (SQLite) задача захватывается условным UPDATE:
+        # строка меняется, только если её попытки не успел увеличить
+        # другой обработчик.
+        ids = []
+        candidates = (
+            Job.objects.filter(available(now)).order_by(*QUEUE_ORDER)
+            .values_list('id', 'attempts')[:limit * JOB_CLAIM_CANDIDATES]
+        )
+        for pk, attempts in candidates:
+            if Job.objects.filter(
+                    available(now), pk=pk, attempts=attempts).update(**lock):
+                ids.append(pk)
+                if len(ids) >= limit:
+                    break
+    return list(Job.objects.filter(pk__in=ids).order_by(*QUEUE_ORDER))
+
+
+def get_retry_delay(attempts):
+    return min(JOB_RETRY_DELAY * 2 ** (attempts - 1), JOB_MAX_RETRY_DELAY)
+
+
+def run_job(job, worker):
+    # Функция выполняется в транзакции: при ошибке её частичные изменения
+    # откатываются и следующая попытка начинает с чистого листа.
+    try:
+        func = import_string(job.name)
+        with transaction.atomic():
+            func(*job.args)
+    except Exception:
+        logger.exception('Задача %s (%s) завершилась с ошибкой', job.pk, job)
+        now = timezone.now()
+        if job.attempts < job.max_attempts:
+            changes = {
+                'status': Job.QUEUED,
+                'run_after': now + timedelta(
+                    seconds=get_retry_delay(job.attempts)
+                ),
+            }
+        else:
+            changes = {'status': Job.FAILED, 'finished': now}
+        Job.objects.filter(pk=job.pk, locked_by=worker).update(
+            locked_by='', locked_until=None,
+            last_error=traceback.format_exc(), **changes
+        )
+        return False
+    Job.objects.filter(pk=job.pk, locked_by=worker).update(
+        status=Job.DONE, finished=timezone.now(),
+        locked_by='', locked_until=None
+    )
+    return True
+
+
+def purge_done(older_than):
+    return Job.objects.filter(
+        status=Job.DONE,
+        finished__lt=timezone.now() - timedelta(seconds=older_than)
+    ).delete()[0]
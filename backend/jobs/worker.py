@@ -0,0 +1,149 @@
+import logging
+import os
+import socket
+import statistics
+import threading
+import time
+from contextlib import nullcontext
+
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from jobs.constants import (JOB_DONE_RETENTION, JOB_LEASE, JOB_POLL_INTERVAL,
+                            JOB_STATS_INTERVAL)
+from jobs.queue import claim, purge_done, run_job
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+class Metrics:
+    # Окно метрик сбрасывается при каждом snapshot(): пропускная
+    # способность и задержки считаются за интервал между отчётами.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.total = self.total_failed = 0
+        self.reset()
+
+    def reset(self):
+        self.since = time.monotonic()
+        self.processed = self.failed = 0
+        self.waits, self.durations = [], []
+
+    def record(self, job, ok, duration):
+        wait = (job.started - job.run_after).total_seconds()
+        with self.lock:
+            self.processed += 1
+            self.total += 1
+            if not ok:
+                self.failed += 1
+                self.total_failed += 1
+            self.waits.append(max(wait, 0.0))
+            self.durations.append(duration)
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = time.monotonic() - self.since
+            stats = {
+                'processed': self.processed,
+                'failed': self.failed,
+                'total': self.total,
+                'total_failed': self.total_failed,
+                'per_second': self.processed / elapsed if elapsed else 0.0,
+                'wait_p50': percentile(self.waits, 0.5),
+                'wait_p95': percentile(self.waits, 0.95),
+                'run_p50': percentile(self.durations, 0.5),
+                'run_p95': percentile(self.durations, 0.95),
+                'run_mean': (
+                    statistics.fmean(self.durations) if self.durations else 0.0
+                ),
+            }
+            self.reset()
+        return stats
+
+
+def format_stats(stats):
+    return (
+        'обработано {processed} (ошибок {failed}), {per_second:.2f}/с, '
+        'ожидание p50 {wait_p50:.3f}с p95 {wait_p95:.3f}с, '
+        'выполнение p50 {run_p50:.3f}с p95 {run_p95:.3f}с; '
+        'всего {total} (ошибок {total_failed})'
+    ).format(**stats)
+
+
+class Worker:
+
+    def __init__(self, threads=1, batch_size=1,
+                 poll_interval=JOB_POLL_INTERVAL, lease=JOB_LEASE,
+                 stats_interval=JOB_STATS_INTERVAL,
+                 retention=JOB_DONE_RETENTION, once=False, log=None):
+        self.threads = threads
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.stats_interval = stats_interval
+        self.retention = retention
+        self.once = once
+        self.log = log or logger.info
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.metrics = Metrics()
+        self.stop = threading.Event()
+        # SQLite допускает одного писателя: параллельные транзакции задач
+        # в потоках одного процесса только упирались бы в database is locked.
+        self.run_lock = (
+            threading.Lock() if connection.vendor == 'sqlite'
+            else nullcontext()
+        )
+
+    def work(self, index):
+        worker = f'{self.name}:{index}'
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                jobs = claim(worker, self.batch_size, self.lease)
+                if not jobs:
+                    if self.once:
+                        return
+                    self.stop.wait(self.poll_interval)
+                    continue
+                for job in jobs:
+                    started = time.perf_counter()
+                    with self.run_lock:
+                        ok = run_job(job, worker)
+                    self.metrics.record(
+                        job, ok, time.perf_counter() - started
+                    )
+        finally:
+            connection.close()
+
+    def run(self):
+        threads = [
+            threading.Thread(
+                target=self.work, args=(index,),
+                name=f'job-worker-{index}', daemon=True
+            )
+            for index in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        started = time.monotonic()
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=self.stats_interval / len(threads))
+            if time.monotonic() - started >= self.stats_interval:
+                started = time.monotonic()
+                self.report()
+                purge_done(self.retention)
+        self.report()
+        connection.close()
+
+    def report(self):
+        self.log(f'[{self.name} {timezone.now():%H:%M:%S}] '
+                 + format_stats(self.metrics.snapshot()))
@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                             RecipeTag, ShoppingCart, Tag)
@@ -7,11 +9,13 @@ from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
 class RecipeIngredientInLine(admin.TabularInline):
     model = RecipeIngredient
     extra = 1
+    autocomplete_fields = ('ingredient',)
 
 
 class RecipeTagInLine(admin.TabularInline):
     model = RecipeTag
     extra = 1
+    autocomplete_fields = ('tag',)
 
 
 class RecipeAdmin(admin.ModelAdmin):
@@ -20,52 +24,68 @@ class RecipeAdmin(admin.ModelAdmin):
         'name', 'author', 'favorite_count',
         'ingredients_in_recipe', 'tags_in_recipe',
     )
-    search_fields = ('name', 'author',)
-    list_filter = ('author', 'name', 'tags__name',)
+    # Поиск только по префиксу названия и точному логину или почте
+    # автора, чтобы не сканировать таблицы через LIKE '%...%'.
+    search_fields = ('^name', '=author__username', '=author__email',)
+    list_filter = ('tags',)
+    autocomplete_fields = ('author',)
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'author'
+        ).annotate(
+            favorite_count=Coalesce(Subquery(
+                Favorite.objects.filter(recipe=OuterRef('pk')).order_by()
+                .values('recipe').annotate(count=Count('id')).values('count')
+            ), 0)
+        ).prefetch_related(
+            Prefetch(
+                'recipe_tag',
+                queryset=RecipeTag.objects.select_related('tag')
+                .order_by('tag__name')
+            ),
+            Prefetch(
+                'ingredient',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+                .order_by('ingredient__name', 'ingredient__measurement_unit')
+            ),
+        )
 
-    @admin.display(description='Добавили в избранное')
+    @admin.display(
+        description='Добавили в избранное', ordering='favorite_count'
+    )
     def favorite_count(self, obj):
-        return obj.favorite.count()
+        return obj.favorite_count
 
     @admin.display(description='Теги рецепта')
     def tags_in_recipe(self, obj):
-        tags = obj.recipe_tag.values('tag__name').order_by('tag__name')
-        return ', '.join([tag['tag__name'] for tag in tags])
+        return ', '.join(
+            recipe_tag.tag.name for recipe_tag in obj.recipe_tag.all()
+        )
 
     @admin.display(description='Ингредиенты рецепта')
     def ingredients_in_recipe(self, obj):
-        ingredients = (
-            RecipeIngredient.objects.filter(recipe=obj)
-            .values(
-                'ingredient__name',
-                'amount',
-                'ingredient__measurement_unit',
-            )
-            .order_by(
-                'ingredient__name',
-                'ingredient__measurement_unit',
-            )
-        )
         return ', '.join(
-            [
-                (
-                    f"{ingredient['ingredient__name']} - "
-                    f"{ingredient['amount']} "
-                    f"{ingredient['ingredient__measurement_unit']}"
-                )
-                for ingredient in ingredients
-            ]
+            f'{item.ingredient.name} - {item.amount} '
+            f'{item.ingredient.measurement_unit}'
+            for item in obj.ingredient.all()
         )
 
 
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('name', 'measurement_unit',)
-    list_filter = ('name',)
-    search_fields = ('name',)
+    list_filter = ('measurement_unit',)
+    search_fields = ('^name',)
+    show_full_result_count = False
 
 
 class RecipeIngredientAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'ingredient', 'amount',)
+    list_select_related = ('recipe', 'ingredient',)
+    raw_id_fields = ('recipe',)
+    autocomplete_fields = ('ingredient',)
+    show_full_result_count = False
 
 
 class TagAdmin(admin.ModelAdmin):
@@ -76,12 +96,22 @@ class TagAdmin(admin.ModelAdmin):
 
 class RecipeTagAdmin(admin.ModelAdmin):
     list_display = ("recipe", "tag",)
+    list_select_related = ('recipe', 'tag',)
+    raw_id_fields = ('recipe',)
+    show_full_result_count = False
+
+
+class UserRecipeAdmin(admin.ModelAdmin):
+    list_display = ('user', 'recipe', 'created',)
+    list_select_related = ('user', 'recipe',)
+    raw_id_fields = ('user', 'recipe',)
+    show_full_result_count = False
 
 
 admin.site.register(Tag, TagAdmin)
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(RecipeTag, RecipeTagAdmin)
 admin.site.register(RecipeIngredient, RecipeIngredientAdmin)
-admin.site.register(Favorite)
-admin.site.register(ShoppingCart)
+admin.site.register(Favorite, UserRecipeAdmin)
+admin.site.register(ShoppingCart, UserRecipeAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
@@ -7,3 +7,45 @@ LIMIT_INGREDIENT_NAME = 100
 LIMIT_TAG_NAME = 20
 LIMIT_RECIPE_NAME = 100
 LIMIT_SHORT_LINK = 6
+
+SHOPPING_LIST_USERS_CHUNK = 500
+
+FEED_FANOUT_LIMIT = 10_000
+FEED_BATCH_SIZE = 1_000
+FEED_BACKFILL_LIMIT = 50
+FEED_BACKFILL_PRIORITY = 10
+FEED_POPULAR_CACHE_KEY = 'feed:popular_authors'
+FEED_POPULAR_CACHE_TIMEOUT = 300
+
+POPULARITY_WINDOWS = (
+    (1, 1.0),
+    (7, 0.5),
+    (30, 0.25),
+    (None, 0.05),
+)
+POPULARITY_CART_WEIGHT = 0.5
+POPULARITY_BATCH_SIZE = 5_000
+
+TRANSFER_BATCH_SIZE = 500
+
+MEDIA_GC_BATCH_SIZE = 1_000
+MEDIA_GC_MIN_AGE = 24 * 60 * 60
+
+SIMILAR_RECIPES_COUNT = 10
+SIMILAR_BLOCK_SIZE = 256
+SIMILAR_TAG_WEIGHT = 0.5
+SIMILAR_LOAD_CHUNK = 10_000
+
+RECOMMENDATIONS_COUNT = 50
+RECOMMENDATIONS_CART_WEIGHT = 0.5
+RECOMMENDATIONS_MEMORY_MB = 256
+RECOMMENDATIONS_LOAD_CHUNK = 50_000
+
+# Просмотры копятся в памяти воркера и пишутся в базу раз в интервал:
+# при падении воркера теряется не больше интервала просмотров.
+VIEW_FLUSH_INTERVAL = 10
+VIEW_FLUSH_BATCH = 500
+VIEW_DEDUP_WINDOW = 30 * 60
+# Отметок просмотров в памяти воркера не больше этого, давние
+# вытесняются раньше конца окна.
+VIEW_SEEN_MAX_ENTRIES = 50_000
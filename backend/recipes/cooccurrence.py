@@ -0,0 +1,133 @@
+from itertools import chain
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+from scipy import sparse
+
+from backend.invalidation import invalidate
+from recipes.constants import (RECOMMENDATIONS_CART_WEIGHT,
+                               RECOMMENDATIONS_COUNT,
+                               RECOMMENDATIONS_LOAD_CHUNK,
+                               RECOMMENDATIONS_MEMORY_MB)
+from recipes.models import Favorite, RecipeRecommendation, ShoppingCart
+from recipes.similarity import top_neighbours
+
+
+def load_pairs(model):
+    # Пары читаются потоком прямо в массив numpy, без списка кортежей.
+    pairs = np.fromiter(
+        chain.from_iterable(
+            model.objects.values_list('user', 'recipe').order_by()
+            .iterator(chunk_size=RECOMMENDATIONS_LOAD_CHUNK)
+        ),
+        dtype=np.int64
+    )
+    return pairs.reshape(-1, 2)
+
+
+def build_interactions():
+    favorites = load_pairs(Favorite)
+    carts = load_pairs(ShoppingCart)
+    pairs = np.concatenate((favorites, carts))
+    user_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+    recipe_ids, columns = np.unique(pairs[:, 1], return_inverse=True)
+    shape = (len(user_ids), len(recipe_ids))
+    weights = np.concatenate((
+        np.ones(len(favorites), dtype=np.float32),
+        np.full(len(carts), RECOMMENDATIONS_CART_WEIGHT, dtype=np.float32),
+    ))
+    # Рецепт в избранном и в корзине складывает оба веса.
+    interactions = sparse.csr_matrix(
+        (weights, (rows, columns)), shape=shape, dtype=np.float32
+    )
+    favorited = sparse.csr_matrix(
+        (np.ones(len(favorites), dtype=bool),
+         (rows[:len(favorites)], columns[:len(favorites)])),
+        shape=shape
+    )
+    return user_ids, recipe_ids, interactions, favorited
+
+
+def get_block_size(users, recipes, memory_mb):
+    # На строку блока приходятся плотная строка пересечений с
+    # пользователями, строка оценок с двумя копиями и индексы int64
+    # от argpartition при выборе лучших.
+    row_bytes = users * 4 + recipes * (4 * 3 + 8)
+    return max(1, memory_mb * 1024 * 1024 // row_bytes)
+
+
+def score_blocks(interactions, favorited, memory_mb):
+    # Оценка рецепта j для пользователя u — сумма косинусных сходств
+    # C[i, j] = Σv x[v,i]·x[v,j] / √(pop[i]·pop[j]) по его рецептам i.
+    # Матрица C рецепт × рецепт не строится: X_u·C = (X̂_u·Xᵀ)·X̂, где
+    # X̂ — X с делением столбцов на √pop, и считается блоками
+    # пользователей в пределах бюджета памяти.
+    popularity = np.asarray(interactions.sum(axis=0)).ravel()
+    scale = sparse.diags(1 / np.sqrt(popularity)).astype(np.float32)
+    normalized = interactions.dot(scale).tocsr()
+    transposed = interactions.T.tocsr()
+    normalized_transposed = normalized.T.tocsr()
+    users, recipes = interactions.shape
+    block_size = get_block_size(users, recipes, memory_mb)
+    for start in range(0, users, block_size):
+        block = slice(start, min(users, start + block_size))
+        # Второе произведение — разреженная матрица на плотную: так
+        # быстрее, чем разреженное произведение с почти плотным итогом.
+        overlap = normalized[block].dot(transposed).toarray()
+        scores = np.ascontiguousarray(
+            normalized_transposed.dot(overlap.T).T
+        )
+        # Уже сохранённое в избранное не рекомендуется.
+        scores[favorited[block].nonzero()] = 0
+        yield start, scores
+
+
+def write_recommendations(user_ids, recipe_ids, start, recipes, scores,
+                          computed):
+    # Строк на блок — сотни тысяч: bulk_create тратит больше времени на
+    # создание моделей и сборку SQL, чем база на вставку.
+    block_user_ids = user_ids[start:start + len(recipes)]
+    computed = connection.ops.adapt_datetimefield_value(computed)
+    table = connection.ops.quote_name(RecipeRecommendation._meta.db_table)
+    rows = [
+        (user_id, int(recipe_ids[recipe]), round(float(score), 6), computed)
+        for user_id, row, row_scores in zip(
+            block_user_ids.tolist(), recipes, scores)
+        for recipe, score in zip(row, row_scores)
+        if score > 0
+    ]
+    with transaction.atomic():
+        RecipeRecommendation.objects.filter(
+            user__in=block_user_ids.tolist()
+        ).delete()
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} (user_id, recipe_id, score, computed) '
+                'VALUES (%s, %s, %s, %s)',
+                rows
+            )
+        # Одна версия на все рекомендации: своя на каждого пользователя
+        # стоила бы операции на строку блока.
+        invalidate('recommendations')
+
+
+def refresh_recommendations(count=RECOMMENDATIONS_COUNT,
+                            memory_mb=RECOMMENDATIONS_MEMORY_MB, log=None):
+    log = log or (lambda message: None)
+    computed = timezone.now()
+    user_ids, recipe_ids, interactions, favorited = build_interactions()
+    log(
+        f'Пользователей: {len(user_ids)}, рецептов: {len(recipe_ids)}, '
+        f'взаимодействий: {interactions.nnz}'
+    )
+    for start, scores in score_blocks(interactions, favorited, memory_mb):
+        recipes, top_scores = top_neighbours(scores, count)
+        write_recommendations(
+            user_ids, recipe_ids, start, recipes, top_scores, computed
+        )
+        log(f'Рекомендации: {start + len(scores)} из {len(user_ids)}')
+    # Остались строки пользователей, у которых больше нет истории.
+    RecipeRecommendation.objects.filter(computed__lt=computed).delete()
+    invalidate('recommendations')
+    return len(user_ids)
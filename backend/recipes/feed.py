@@ -0,0 +1,127 @@
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from backend.invalidation import invalidate
+from jobs.queue import enqueue
+from recipes.constants import (FEED_BACKFILL_LIMIT, FEED_BACKFILL_PRIORITY,
+                               FEED_BATCH_SIZE, FEED_FANOUT_LIMIT,
+                               FEED_POPULAR_CACHE_KEY,
+                               FEED_POPULAR_CACHE_TIMEOUT)
+from recipes.models import FeedEntry, Recipe, RecipeEvent
+from users.models import Follow
+
+
+def is_popular_author(author_id):
+    followers = Follow.objects.filter(following=author_id)
+    return followers[:FEED_FANOUT_LIMIT].count() >= FEED_FANOUT_LIMIT
+
+
+def get_popular_author_ids():
+    # Рецепты авторов с огромным числом подписчиков не раскладываются
+    # по лентам, а подмешиваются при чтении.
+    authors = cache.get(FEED_POPULAR_CACHE_KEY)
+    if authors is None:
+        authors = find_popular_author_ids()
+        cache.set(
+            FEED_POPULAR_CACHE_KEY, authors, FEED_POPULAR_CACHE_TIMEOUT
+        )
+    return authors
+
+
+def find_popular_author_ids():
+    return set(
+        Follow.objects.values('following')
+        .annotate(followers=Count('id'))
+        .filter(followers__gte=FEED_FANOUT_LIMIT)
+        .values_list('following', flat=True)
+    )
+
+
+def fan_out(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).values(
+        'author', 'pub_date'
+    ).first()
+    if recipe is None or is_popular_author(recipe['author']):
+        return
+    followers = Follow.objects.filter(
+        following=recipe['author']
+    ).values_list('user', flat=True).order_by('user')
+    batch = []
+    for user_id in followers.iterator(chunk_size=FEED_BATCH_SIZE):
+        batch.append(FeedEntry(
+            user_id=user_id, recipe_id=recipe_id,
+            author_id=recipe['author'], pub_date=recipe['pub_date']
+        ))
+        if len(batch) >= FEED_BATCH_SIZE:
+            write_entries(batch)
+            batch = []
+    write_entries(batch)
+
+
+def write_entries(entries):
+    # bulk_create сигналов не шлёт, а от ленты зависят закешированные
+    # счётчики страниц подписчиков.
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    invalidate(*{f'user:{entry.user_id}' for entry in entries})
+
+
+def backfill(user_id, author_id, popular=None):
+    if popular is None:
+        popular = {author_id} if is_popular_author(author_id) else set()
+    if author_id in popular:
+        return
+    recipes = Recipe.objects.filter(author=author_id).order_by(
+        '-pub_date'
+    ).values_list('id', 'pub_date')[:FEED_BACKFILL_LIMIT]
+    write_entries([
+        FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                  author_id=author_id, pub_date=pub_date)
+        for recipe_id, pub_date in recipes
+    ])
+
+
+def rebuild_feeds(user_ids=None):
+    follows = Follow.objects.order_by('id').values_list('user', 'following')
+    if user_ids is not None:
+        follows = follows.filter(user__in=user_ids)
+    # Популярные авторы определяются один раз на весь проход.
+    popular = find_popular_author_ids()
+    count = 0
+    for user_id, author_id in follows.iterator(chunk_size=FEED_BATCH_SIZE):
+        backfill(user_id, author_id, popular)
+        count += 1
+    return count
+
+
+def recipe_published(recipe_id, author_id, notify=True):
+    # Событие коммитится вместе с рецептом, его читают потоки SSE.
+    # Импорт старых рецептов ленты заполняет, но подписчиков не будит.
+    if notify:
+        RecipeEvent.objects.create(recipe_id=recipe_id, author_id=author_id)
+    enqueue(fan_out, recipe_id)
+
+
+def author_followed(user_id, author_id):
+    # Подписчик ждёт заполненную ленту сразу после подписки.
+    enqueue(backfill, user_id, author_id, priority=FEED_BACKFILL_PRIORITY)
+
+
+def author_unfollowed(user_id, author_id):
+    FeedEntry.objects.filter(user=user_id, author=author_id).delete()
+    invalidate(f'user:{user_id}')
+
+
+def get_feed(user):
+    popular = get_popular_author_ids()
+    followed_popular = list(
+        Follow.objects.filter(user=user, following__in=popular)
+        .values_list('following', flat=True)
+    ) if popular else []
+    if not followed_popular:
+        return Recipe.objects.filter(
+            feed_entries__user=user
+        ).order_by('-feed_entries__pub_date', '-id')
+    return Recipe.objects.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('recipe'))
+        | Q(author__in=followed_popular)
+    ).order_by('-pub_date', '-id')
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.shopping_list import find_mismatches, refresh_shopping_lists
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет сохранённые списки покупок с суммой ингредиентов '
+        'рецептов в корзинах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, nargs='+',
+            help='Проверить только указанных пользователей.'
+        )
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Пересобрать списки пользователей с расхождениями.'
+        )
+
+    def handle(self, *args, **options):
+        broken = set()
+        for user_id, ingredient_id, expected, stored in find_mismatches(
+                options['users']):
+            broken.add(user_id)
+            self.stdout.write(
+                f'user={user_id} ingredient={ingredient_id} '
+                f'ожидается={expected} в таблице={stored}'
+            )
+        if not broken:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        if options['fix']:
+            refresh_shopping_lists(sorted(broken))
+            self.stdout.write(self.style.SUCCESS(
+                f'Исправлено списков покупок: {len(broken)}'
+            ))
+            return
+        raise CommandError(f'Списков с расхождениями: {len(broken)}')
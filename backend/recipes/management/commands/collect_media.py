@@ -0,0 +1,91 @@
+import os
+import time
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from recipes.constants import MEDIA_GC_BATCH_SIZE, MEDIA_GC_MIN_AGE
+
+
+def get_file_fields():
+    return [
+        field
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField)
+        and field.storage is default_storage
+        and isinstance(field.upload_to, str)
+    ]
+
+
+def walk_files(directory, min_mtime):
+    root = default_storage.path('')
+    for path, _, files in os.walk(default_storage.path(directory)):
+        for filename in files:
+            full_path = os.path.join(path, filename)
+            if os.path.getmtime(full_path) < min_mtime:
+                yield os.path.relpath(full_path, root).replace(os.sep, '/')
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из MEDIA_ROOT файлы, на которые не ссылается ни одно '
+        'поле FileField/ImageField.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено.'
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=MEDIA_GC_MIN_AGE,
+            help='Не трогать файлы моложе указанного числа секунд: '
+                 'их ссылка может быть ещё в незакоммиченной транзакции.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=MEDIA_GC_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        fields = get_file_fields()
+        directories = sorted({
+            field.upload_to.split('%')[0].strip('/') for field in fields
+        })
+        min_mtime = time.time() - options['min_age']
+        checked = removed = 0
+        for directory in directories:
+            if not directory or not default_storage.exists(directory):
+                continue
+            batch = []
+            for name in walk_files(directory, min_mtime):
+                batch.append(name)
+                if len(batch) >= options['batch_size']:
+                    removed += self.collect(batch, fields, options['dry_run'])
+                    checked += len(batch)
+                    batch = []
+            removed += self.collect(batch, fields, options['dry_run'])
+            checked += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено файлов: {checked}, '
+            f'{"к удалению" if options["dry_run"] else "удалено"}: {removed}'
+        ))
+
+    def collect(self, names, fields, dry_run):
+        referenced = set()
+        for field in fields:
+            referenced.update(
+                field.model._base_manager.filter(
+                    **{f'{field.name}__in': names}
+                ).values_list(field.name, flat=True)
+            )
+        orphans = [name for name in names if name not in referenced]
+        for name in orphans:
+            if dry_run:
+                self.stdout.write(name)
+            else:
+                # delete() у хранилища по содержимому ничего не делает.
+                FileSystemStorage.delete(default_storage, name)
+        return len(orphans)
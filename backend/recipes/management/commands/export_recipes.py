@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from recipes.constants import TRANSFER_BATCH_SIZE
+from recipes.transfer import dump_record, export_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает рецепты с ингредиентами, тегами, авторами и путями '
+        'картинок в формате JSON Lines. Сами файлы из media не копируются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', '-o',
+            help='Файл для выгрузки; по умолчанию stdout.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=TRANSFER_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        if options['output']:
+            file = open(options['output'], 'w', encoding='UTF-8')
+        else:
+            file = sys.stdout
+        count = 0
+        try:
+            for record in export_recipes(options['batch_size']):
+                file.write(dump_record(record))
+                count += 1
+        finally:
+            if file is not sys.stdout:
+                file.close()
+        self.stderr.write(
+            self.style.SUCCESS(f'Выгружено рецептов: {count}')
+        )
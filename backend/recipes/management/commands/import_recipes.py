@@ -0,0 +1,82 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.constants import TRANSFER_BATCH_SIZE
+from recipes.transfer import import_batch, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает рецепты из JSON Lines, созданного export_recipes. '
+        'Недостающие авторы, теги и ингредиенты создаются, уже '
+        'перенесённые рецепты (по short_link) пропускаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки.')
+        parser.add_argument(
+            '--batch-size', type=int, default=TRANSFER_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл с номером последней загруженной строки; '
+                 'по умолчанию <path>.checkpoint.'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Игнорировать сохранённую контрольную точку.'
+        )
+        parser.add_argument(
+            '--map',
+            help='Дописывать в файл пары "id в источнике<TAB>id здесь".'
+        )
+
+    def handle(self, *args, **options):
+        checkpoint = options['checkpoint'] or options['path'] + '.checkpoint'
+        self.committed = start = 0
+        if os.path.exists(checkpoint) and not options['restart']:
+            with open(checkpoint, encoding='UTF-8') as file:
+                self.committed = start = json.load(file)['line']
+            self.stdout.write(f'Продолжение со строки {start + 1}')
+        id_map = open(options['map'], 'a') if options['map'] else None
+        processed = created = 0
+        try:
+            with open(options['path'], encoding='UTF-8') as file:
+                batch, line = [], start
+                for line, record in read_records(file, start):
+                    batch.append(record)
+                    if len(batch) >= options['batch_size']:
+                        created += self.load(batch, line, checkpoint, id_map)
+                        processed += len(batch)
+                        batch = []
+                if batch:
+                    created += self.load(batch, line, checkpoint, id_map)
+                    processed += len(batch)
+        except (ValueError, KeyError) as error:
+            raise CommandError(
+                f'Ошибка после строки {self.committed}: {error}'
+            )
+        finally:
+            if id_map is not None:
+                id_map.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано рецептов: {processed}, создано: {created}'
+        ))
+
+    def load(self, batch, line, checkpoint, id_map):
+        mapping, created = import_batch(batch)
+        if id_map is not None:
+            id_map.writelines(
+                f'{source}\t{target}\n' for source, target in mapping.items()
+            )
+            id_map.flush()
+        # Точка сохраняется только после коммита пачки: при падении
+        # загрузка продолжится с первой незавершённой пачки.
+        with open(checkpoint + '.tmp', 'w', encoding='UTF-8') as file:
+            json.dump({'line': line}, file)
+        os.replace(checkpoint + '.tmp', checkpoint)
+        self.committed = line
+        self.stdout.write(f'Строк: {line}, создано рецептов: {created}')
+        return created
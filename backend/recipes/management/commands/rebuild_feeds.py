@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feed import rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет ленты подписок последними рецептами авторов, '
+        'на которых подписаны пользователи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, nargs='+',
+            help='Заполнить ленты только указанных пользователей.'
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_feeds(options['users'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано подписок: {count}')
+        )
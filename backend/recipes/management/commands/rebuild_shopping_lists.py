@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from recipes.shopping_list import rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает списки покупок из корзин пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, nargs='+',
+            help='Пересобрать списки только указанных пользователей.'
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_shopping_lists(options['users'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано списков покупок: {count}')
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from recipes.constants import POPULARITY_BATCH_SIZE
+from recipes.popularity import refresh_popularity
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает популярность рецептов по добавлениям в избранное '
+        'и корзину за последние периоды.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=POPULARITY_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        updated = refresh_popularity(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлена популярность рецептов: {updated}')
+        )
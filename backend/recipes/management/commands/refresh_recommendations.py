@@ -0,0 +1,106 @@
+import os
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from recipes.constants import RECOMMENDATIONS_COUNT, RECOMMENDATIONS_MEMORY_MB
+from recipes.cooccurrence import refresh_recommendations
+from recipes.models import Favorite, RecipeRecommendation, ShoppingCart
+from recipes.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает персональные рекомендации по совместной встречаемости '
+        'рецептов в избранном и корзинах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count', type=int, default=RECOMMENDATIONS_COUNT,
+            help='Сколько рекомендаций хранить для пользователя.'
+        )
+        parser.add_argument(
+            '--memory-mb', type=int, default=RECOMMENDATIONS_MEMORY_MB,
+            help='Бюджет памяти на блок пользователей.'
+        )
+        parser.add_argument(
+            '--benchmark', action='store_true',
+            help='Замерить расчёт на отдельной тестовой базе.'
+        )
+        parser.add_argument('--users', type=int, default=50_000)
+        parser.add_argument('--recipes', type=int, default=50_000)
+        parser.add_argument('--favorites', type=int, default=1_000_000)
+        parser.add_argument('--carts', type=int, default=200_000)
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не удалять тестовую базу, чтобы не заполнять её заново.'
+        )
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            return self.benchmark(options)
+        users = refresh_recommendations(
+            options['count'], options['memory_mb'], log=self.stdout.write
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Рекомендации пересчитаны: {users}')
+        )
+
+    def benchmark(self, options):
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        if connection.vendor == 'sqlite':
+            test_settings['NAME'] = os.path.join(
+                settings.BASE_DIR, 'benchmark_recommendations.sqlite3'
+            )
+        else:
+            test_settings['NAME'] = 'test_benchmark_recommendations'
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        try:
+            if not Favorite.objects.exists():
+                self.seed(options)
+            started = time.perf_counter()
+            tracemalloc.start()
+            users = refresh_recommendations(
+                options['count'], options['memory_mb'],
+                log=self.stdout.write
+            )
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            elapsed = time.perf_counter() - started
+            rows = RecipeRecommendation.objects.count()
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb']
+            )
+            teardown_test_environment()
+        self.stdout.write(self.style.SUCCESS(
+            f'Избранное: {options["favorites"]}, пользователей: {users}, '
+            f'строк рекомендаций: {rows}, время: {elapsed:.1f} с, '
+            f'пик памяти: {peak / 1024 / 1024:.0f} МиБ'
+        ))
+
+    def seed(self, options):
+        seeder = Seeder(log=self.stdout.write)
+        tag_ids = seeder.ensure_tags(1)
+        ingredient_ids = seeder.ensure_ingredients(1)
+        user_ids = seeder.create_users(options['users'])
+        # Для расчёта важны только пары пользователь — рецепт.
+        recipe_ids = seeder.create_recipes(
+            options['recipes'], user_ids, tag_ids, ingredient_ids, (1, 1)
+        )
+        seeder.create_pairs(
+            Favorite, ('user_id', 'recipe_id'),
+            user_ids, recipe_ids, options['favorites']
+        )
+        seeder.create_pairs(
+            ShoppingCart, ('user_id', 'recipe_id'),
+            user_ids, recipe_ids, options['carts']
+        )
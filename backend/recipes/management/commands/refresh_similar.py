@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from recipes.constants import SIMILAR_BLOCK_SIZE, SIMILAR_RECIPES_COUNT
+from recipes.similarity import refresh_neighbours
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает похожие рецепты по ингредиентам и тегам. По '
+        'умолчанию обрабатывает рецепты, изменённые с прошлого запуска.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать соседей всех рецептов.'
+        )
+        parser.add_argument(
+            '--count', type=int, default=SIMILAR_RECIPES_COUNT,
+            help='Сколько соседей хранить для рецепта.'
+        )
+        parser.add_argument(
+            '--block-size', type=int, default=SIMILAR_BLOCK_SIZE,
+            help='Сколько рецептов сравнивать с каталогом за один шаг.'
+        )
+
+    def handle(self, *args, **options):
+        changed, refreshed = refresh_neighbours(
+            full=options['full'], count=options['count'],
+            block_size=options['block_size'],
+            log=lambda message: self.stdout.write(message)
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Изменено рецептов: {changed}, '
+            f'пересчитаны соседи: {refreshed}'
+        ))
@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feed import rebuild_feeds
+from recipes.models import Favorite, ShoppingCart
+from recipes.popularity import refresh_popularity
+from recipes.seeding import Seeder
+from recipes.shopping_list import rebuild_shopping_lists
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, рецептами, '
+        'подписками, избранным и корзинами покупок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--recipes', type=int, default=100_000)
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument(
+            '--ingredients', type=int, default=2_000,
+            help='Сколько ингредиентов создать, если справочник пуст.'
+        )
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, nargs=2,
+            default=(3, 12), metavar=('MIN', 'MAX')
+        )
+        parser.add_argument('--favorites', type=int, default=1_000_000)
+        parser.add_argument('--carts', type=int, default=200_000)
+        parser.add_argument('--follows', type=int, default=200_000)
+        parser.add_argument(
+            '--exponent', type=float, default=1.1,
+            help='Показатель степенного распределения популярности.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Префикс логинов и слагов создаваемых объектов.'
+        )
+        parser.add_argument('--password', default='foodgram')
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Загружать связи через COPY (только PostgreSQL).'
+        )
+
+    def handle(self, *args, **options):
+        seeder = Seeder(
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            exponent=options['exponent'],
+            use_copy=options['copy'],
+            prefix=options['prefix'],
+            password=options['password'],
+            log=self.stdout.write,
+        )
+        tag_ids = seeder.ensure_tags(options['tags'])
+        ingredient_ids = seeder.ensure_ingredients(options['ingredients'])
+        user_ids = seeder.create_users(options['users'])
+        recipe_ids = seeder.create_recipes(
+            options['recipes'], user_ids, tag_ids, ingredient_ids,
+            options['ingredients_per_recipe']
+        )
+        seeder.create_pairs(
+            Favorite, ('user_id', 'recipe_id'),
+            user_ids, recipe_ids, options['favorites']
+        )
+        seeder.create_pairs(
+            ShoppingCart, ('user_id', 'recipe_id'),
+            user_ids, recipe_ids, options['carts']
+        )
+        # Корзины вставлены без сигналов, списки покупок собираем отдельно.
+        rebuild_shopping_lists()
+        refresh_popularity(options['batch_size'])
+        seeder.create_pairs(
+            Follow, ('user_id', 'following_id'),
+            user_ids, user_ids, options['follows'], skip_self=True
+        )
+        # Подписки тоже вставлены без сигналов: ленты заполняются здесь.
+        self.stdout.write(f'Ленты: подписок {rebuild_feeds()}')
+        self.stdout.write(
+            self.style.SUCCESS('Синтетические данные загружены')
+        )
@@ -4,6 +4,7 @@ import string
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 from recipes.constants import (LIMIT_INGREDIENT_NAME, LIMIT_RECIPE_NAME,
                                LIMIT_SHORT_LINK, LIMIT_TAG_NAME, MIN_LIMIT)
@@ -24,6 +25,7 @@ class Tag(models.Model):
     )
 
     class Meta:
+        ordering = ('id',)
         verbose_name = 'Тег'
         verbose_name_plural = 'Теги'
 
@@ -95,6 +97,31 @@ class Recipe(models.Model):
         null=True,
         verbose_name='Короткая ссылка рецепта',
     )
+    pub_date = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name='Дата публикации'
+    )
+    popularity = models.FloatField(
+        default=0,
+        db_index=True,
+        verbose_name='Популярность'
+    )
+    views = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        verbose_name='Просмотры'
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата изменения'
+    )
+    neighbours_updated = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата расчёта похожих рецептов'
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
@@ -159,6 +186,7 @@ class RecipeIngredient(models.Model):
     )
 
     class Meta:
+        ordering = ('id',)
         verbose_name = 'Ингредиент рецепта'
         verbose_name_plural = 'Ингредиенты рецепта'
 
@@ -179,6 +207,10 @@ class Favorite(models.Model):
         User, on_delete=models.CASCADE,
         related_name='favorite'
     )
+    created = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Дата добавления'
+    )
 
     class Meta:
         verbose_name = 'Избранное'
@@ -201,6 +233,10 @@ class ShoppingCart(models.Model):
         User, on_delete=models.CASCADE,
         related_name='shopping_cart'
     )
+    created = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Дата добавления'
+    )
 
     class Meta:
         verbose_name = 'Корзина покупок'
@@ -212,3 +248,168 @@ class ShoppingCart(models.Model):
                 name='shopping_cart_unique'
             )
         ]
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Общее количество'
+    )
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Списки покупок'
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='shopping_list_item_unique'
+            )
+        ]
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор рецепта'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='feed_entry_unique'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date'),
+                name='feed_entry_user_date'
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='feed_entry_user_author'
+            ),
+        ]
+
+
+class RecipeNeighbour(models.Model):
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='neighbours',
+        verbose_name='Рецепт'
+    )
+    neighbour = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='Сходство'
+    )
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'neighbour'),
+                name='recipe_neighbour_unique'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('recipe', '-score'),
+                name='recipe_neighbour_score'
+            ),
+        ]
+
+
+class RecipeRecommendation(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='Оценка'
+    )
+    computed = models.DateTimeField(
+        verbose_name='Дата расчёта'
+    )
+
+    class Meta:
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='recipe_recommendation_unique'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-score'),
+                name='recommendation_user_score'
+            ),
+            models.Index(
+                fields=('computed',),
+                name='recommendation_computed'
+            ),
+        ]
+
+
+class RecipeEvent(models.Model):
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор рецепта'
+    )
+    created = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name='Дата события'
+    )
+
+    class Meta:
+        verbose_name = 'Событие рецепта'
+        verbose_name_plural = 'События рецептов'
+        ordering = ('id',)
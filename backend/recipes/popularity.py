@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from backend.invalidation import invalidate
+from recipes.constants import (POPULARITY_BATCH_SIZE, POPULARITY_CART_WEIGHT,
+                               POPULARITY_WINDOWS)
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+
+def window_counts(model, first_id, last_id, now):
+    # Окна вложены друг в друга: свежее добавление попадает во все окна,
+    # поэтому его вклад в оценку больше, чем у давнего. У записей,
+    # сделанных до появления поля created, миграция ставит дату
+    # публикации рецепта, поэтому старые рецепты не выглядят свежими.
+    annotations = {
+        f'window_{number}': Count('id', filter=Q(
+            created__gte=now - timedelta(days=days)
+        )) if days else Count('id')
+        for number, (days, _) in enumerate(POPULARITY_WINDOWS)
+    }
+    return model.objects.filter(
+        recipe__gte=first_id, recipe__lte=last_id
+    ).values('recipe').annotate(**annotations).order_by()
+
+
+def compute_scores(first_id, last_id, now):
+    scores = {}
+    for model, weight in (
+            (Favorite, 1), (ShoppingCart, POPULARITY_CART_WEIGHT)):
+        for row in window_counts(model, first_id, last_id, now):
+            score = sum(
+                row[f'window_{number}'] * window_weight
+                for number, (_, window_weight) in enumerate(POPULARITY_WINDOWS)
+            )
+            scores[row['recipe']] = scores.get(row['recipe'], 0) + (
+                weight * score
+            )
+    return scores
+
+
+def refresh_popularity(batch_size=POPULARITY_BATCH_SIZE, now=None):
+    now = now or timezone.now()
+    last_id, updated = 0, 0
+    while True:
+        batch = list(
+            Recipe.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'popularity')[:batch_size]
+        )
+        if not batch:
+            # bulk_update не отправляет сигналы, порядок «популярные»
+            # в кешах каталога сбрасывается явно.
+            if updated:
+                invalidate('catalog', 'recipes')
+            return updated
+        last_id = batch[-1][0]
+        scores = compute_scores(batch[0][0], last_id, now)
+        changed = [
+            Recipe(id=recipe_id, popularity=round(scores.get(recipe_id, 0), 4))
+            for recipe_id, popularity in batch
+            if round(scores.get(recipe_id, 0), 4) != popularity
+        ]
+        Recipe.objects.bulk_update(changed, ('popularity',))
+        updated += len(changed)
@@ -0,0 +1,12 @@
+from recipes.models import Recipe, RecipeRecommendation
+
+
+def get_recommendations(user):
+    # Рекомендации считает команда refresh_recommendations. Пока истории
+    # у пользователя нет, показываются популярные рецепты.
+    recipes = Recipe.objects.exclude(favorite__user=user)
+    if not RecipeRecommendation.objects.filter(user=user).exists():
+        return recipes.order_by('-popularity', '-id')
+    return recipes.filter(
+        recommendations__user=user
+    ).order_by('-recommendations__score', '-id')
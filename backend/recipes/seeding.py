@@ -0,0 +1,236 @@
+import csv
+import io
+import string
+from datetime import timedelta
+from itertools import accumulate
+from random import Random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from recipes.constants import LIMIT_SHORT_LINK
+from recipes.models import Ingredient, Recipe, RecipeIngredient, RecipeTag, Tag
+
+User = get_user_model()
+
+SHORT_LINK_ALPHABET = string.ascii_letters + string.digits
+SEED_IMAGE = 'recipes/seed.png'
+SEED_TEXT = 'Сгенерированный рецепт. ' * 10
+SEED_PERIOD = 365 * 24 * 60 * 60
+
+
+def power_law_weights(count, exponent, rng):
+    # Кумулятивные веса закона Ципфа, ранги перемешаны, чтобы популярными
+    # оказывались случайные объекты, а не первые по id.
+    ranks = list(range(1, count + 1))
+    rng.shuffle(ranks)
+    return list(accumulate(1 / rank ** exponent for rank in ranks))
+
+
+class Seeder:
+
+    def __init__(self, seed=0, batch_size=5_000, exponent=1.1,
+                 use_copy=False, prefix='seed', password='foodgram',
+                 log=None):
+        self.rng = Random(seed)
+        self.batch_size = batch_size
+        self.exponent = exponent
+        self.use_copy = use_copy and connection.vendor == 'postgresql'
+        self.prefix = prefix
+        self.password = make_password(password)
+        self.log = log or (lambda message: None)
+
+    def write(self, model, fields, rows):
+        if not rows:
+            return
+        with transaction.atomic():
+            if self.use_copy:
+                self.copy(model, fields, rows)
+            else:
+                model.objects.bulk_create(
+                    [model(**dict(zip(fields, row))) for row in rows],
+                    batch_size=self.batch_size
+                )
+
+    def copy(self, model, fields, rows):
+        # COPY не знает о значениях по умолчанию из моделей Django,
+        # поэтому недостающие столбцы заполняются здесь.
+        now = timezone.now()
+        missing = [
+            field for field in model._meta.concrete_fields
+            if not field.primary_key and field.attname not in fields
+            and (field.has_default() or getattr(field, 'auto_now', False))
+        ]
+        defaults = tuple(
+            field.get_default() if field.has_default() else now
+            for field in missing
+        )
+        fields = tuple(fields) + tuple(field.attname for field in missing)
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(row + defaults for row in rows)
+        buffer.seek(0)
+        columns = ', '.join(
+            model._meta.get_field(field).column for field in fields
+        )
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(
+                f'COPY {model._meta.db_table} ({columns}) '
+                'FROM STDIN WITH (FORMAT csv)',
+                buffer
+            )
+
+    def ensure_tags(self, count):
+        Tag.objects.bulk_create(
+            [Tag(name=f'{self.prefix} тег {number}',
+                 slug=f'{self.prefix}-tag-{number}')
+             for number in range(count)],
+            ignore_conflicts=True
+        )
+        return list(Tag.objects.order_by('id').values_list('id', flat=True))
+
+    def ensure_ingredients(self, count):
+        if not Ingredient.objects.exists():
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=f'Ингредиент {number}',
+                            measurement_unit='г')
+                 for number in range(count)],
+                batch_size=self.batch_size
+            )
+        return list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+
+    def create_users(self, count):
+        fields = ('username', 'email', 'first_name', 'last_name', 'password')
+        for start in range(0, count, self.batch_size):
+            self.write(User, fields, [
+                (f'{self.prefix}{number}',
+                 f'{self.prefix}{number}@foodgram.local',
+                 'Имя', 'Фамилия', self.password)
+                for number in range(start, min(count, start + self.batch_size))
+            ])
+            self.log(f'Пользователи: {min(count, start + self.batch_size)}')
+        return list(
+            User.objects.filter(username__startswith=self.prefix)
+            .order_by('id').values_list('id', flat=True)
+        )
+
+    def short_links(self, count, used):
+        links = []
+        while len(links) < count:
+            link = ''.join(
+                self.rng.choices(SHORT_LINK_ALPHABET, k=LIMIT_SHORT_LINK)
+            )
+            if link not in used:
+                used.add(link)
+                links.append(link)
+        taken = set(
+            Recipe.objects.filter(short_link__in=links)
+            .values_list('short_link', flat=True)
+        )
+        if taken:
+            links = [link for link in links if link not in taken]
+            links += self.short_links(len(taken), used)
+        return links
+
+    def create_recipes(self, count, author_ids, tag_ids, ingredient_ids,
+                       ingredients_per_recipe=(3, 12)):
+        authors = power_law_weights(len(author_ids), self.exponent, self.rng)
+        ingredients = power_law_weights(
+            len(ingredient_ids), self.exponent, self.rng
+        )
+        recipe_ids, used, now = [], set(), timezone.now()
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            links = self.short_links(size, used)
+            chosen = self.rng.choices(author_ids, cum_weights=authors, k=size)
+            # Строки пишутся напрямую: Recipe.save() и генерация
+            # short_link на каждый объект здесь не вызываются.
+            self.write(
+                Recipe,
+                ('author_id', 'name', 'image', 'text',
+                 'cooking_time', 'short_link', 'pub_date'),
+                [(author_id, f'Рецепт {start + number}', SEED_IMAGE,
+                  SEED_TEXT, self.rng.randint(1, 180), link,
+                  now - timedelta(seconds=self.rng.randint(0, SEED_PERIOD)))
+                 for number, (author_id, link)
+                 in enumerate(zip(chosen, links))]
+            )
+            ids = dict(
+                Recipe.objects.filter(short_link__in=links)
+                .values_list('short_link', 'id')
+            )
+            batch_ids = [ids[link] for link in links]
+            recipe_ids.extend(batch_ids)
+            links, tags = [], []
+            for recipe_id in batch_ids:
+                amount = self.rng.randint(*ingredients_per_recipe)
+                for ingredient_id in self.distinct(
+                        ingredient_ids, ingredients, amount):
+                    links.append(
+                        (recipe_id, ingredient_id, self.rng.randint(1, 500))
+                    )
+                for tag_id in self.rng.sample(
+                        tag_ids, self.rng.randint(1, min(3, len(tag_ids)))):
+                    tags.append((recipe_id, tag_id))
+            self.write(
+                RecipeIngredient, ('recipe_id', 'ingredient_id', 'amount'),
+                links
+            )
+            self.write(RecipeTag, ('recipe_id', 'tag_id'), tags)
+            self.log(f'Рецепты: {start + size}')
+        return recipe_ids
+
+    def distinct(self, population, cum_weights, amount):
+        amount = min(amount, len(population))
+        if amount * 2 > len(population):
+            return self.rng.sample(population, amount)
+        chosen = set()
+        while len(chosen) < amount:
+            chosen.update(self.rng.choices(
+                population, cum_weights=cum_weights, k=amount - len(chosen)
+            ))
+        return chosen
+
+    def create_pairs(self, model, fields, owner_ids, target_ids, total,
+                     skip_self=False):
+        # И активность владельцев, и популярность объектов распределены
+        # по закону Ципфа; пары в пределах одного владельца не повторяются.
+        # skip_self — владельцы и объекты из одной таблицы (подписки),
+        # пара с самим собой не создаётся.
+        stamped = any(
+            field.name == 'created' for field in model._meta.fields
+        )
+        if stamped:
+            fields = tuple(fields) + ('created',)
+        now = timezone.now()
+        activity = power_law_weights(len(owner_ids), self.exponent, self.rng)
+        popularity = power_law_weights(
+            len(target_ids), self.exponent, self.rng
+        )
+        scale = total / activity[-1]
+        previous, rows, created = 0, [], 0
+        for owner_id, weight in zip(owner_ids, activity):
+            amount = round((weight - previous) * scale)
+            previous = weight
+            if not amount:
+                continue
+            targets = self.distinct(target_ids, popularity, amount)
+            for target_id in targets:
+                if skip_self and target_id == owner_id:
+                    continue
+                row = (owner_id, target_id)
+                if stamped:
+                    row += (now - timedelta(
+                        seconds=self.rng.randint(0, SEED_PERIOD)
+                    ),)
+                rows.append(row)
+            if len(rows) >= self.batch_size:
+                self.write(model, fields, rows)
+                created += len(rows)
+                rows = []
+                self.log(f'{model.__name__}: {created}')
+        self.write(model, fields, rows)
+        return created + len(rows)
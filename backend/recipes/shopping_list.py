@@ -0,0 +1,134 @@
+from collections import defaultdict
+from threading import local
+
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.constants import SHOPPING_LIST_USERS_CHUNK
+from recipes.models import RecipeIngredient, ShoppingCart, ShoppingListItem
+from users.models import User
+
+_pending = local()
+
+
+def _get_pending():
+    if not hasattr(_pending, 'users'):
+        _pending.users = defaultdict(set)
+        _pending.recipes = defaultdict(set)
+    return _pending
+
+
+def _chunks(items, size=SHOPPING_LIST_USERS_CHUNK):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def live_totals(user_ids, ingredient_ids=None):
+    totals = RecipeIngredient.objects.filter(
+        recipe__shopping_cart__user__in=user_ids
+    )
+    if ingredient_ids is not None:
+        totals = totals.filter(ingredient__in=ingredient_ids)
+    return {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in totals.values_list(
+            'recipe__shopping_cart__user', 'ingredient'
+        ).annotate(total=Sum('amount')).order_by()
+    }
+
+
+def refresh_shopping_lists(user_ids, ingredient_ids=None):
+    # Если переданы ингредиенты, пересчитываются только их строки,
+    # остальные позиции списка не читаются и не перезаписываются.
+    for chunk in _chunks(user_ids):
+        items = ShoppingListItem.objects.filter(user__in=chunk)
+        if ingredient_ids is not None:
+            items = items.filter(ingredient__in=ingredient_ids)
+        with transaction.atomic():
+            # Строки пользователей блокируются в порядке id: параллельные
+            # пересчёты одного списка идут по очереди и не вставляют
+            # одну позицию дважды. Суммы читаются уже под блокировкой.
+            list(
+                User.objects.select_for_update().filter(pk__in=chunk)
+                .order_by('pk').values_list('pk', flat=True)
+            )
+            totals = live_totals(chunk, ingredient_ids)
+            items.delete()
+            ShoppingListItem.objects.bulk_create([
+                ShoppingListItem(
+                    user_id=user_id, ingredient_id=ingredient_id,
+                    total_amount=total
+                )
+                for (user_id, ingredient_id), total in totals.items()
+            ])
+
+
+def rebuild_shopping_lists(user_ids=None):
+    if user_ids is None:
+        user_ids = set(
+            ShoppingCart.objects.values_list('user', flat=True).distinct()
+        ) | set(
+            ShoppingListItem.objects.values_list('user', flat=True).distinct()
+        )
+    user_ids = sorted(user_ids)
+    refresh_shopping_lists(user_ids)
+    return len(user_ids)
+
+
+def find_mismatches(user_ids=None):
+    if user_ids is None:
+        user_ids = set(
+            ShoppingCart.objects.values_list('user', flat=True).distinct()
+        ) | set(
+            ShoppingListItem.objects.values_list('user', flat=True).distinct()
+        )
+    for chunk in _chunks(sorted(user_ids)):
+        expected = live_totals(chunk)
+        stored = dict(
+            ((user_id, ingredient_id), total)
+            for user_id, ingredient_id, total in ShoppingListItem.objects
+            .filter(user__in=chunk)
+            .values_list('user', 'ingredient', 'total_amount')
+        )
+        for key in sorted(expected.keys() | stored.keys()):
+            if expected.get(key) != stored.get(key):
+                yield key + (expected.get(key), stored.get(key))
+
+
+def cart_changed(user_id, recipe_id):
+    _get_pending().users[user_id].add(recipe_id)
+    transaction.on_commit(flush)
+
+
+def recipe_ingredients_changed(recipe_id, ingredient_ids):
+    _get_pending().recipes[recipe_id].update(ingredient_ids)
+    transaction.on_commit(flush)
+
+
+def flush():
+    # Изменения копятся до коммита транзакции: пакетное добавление
+    # или удаление рецептов пересчитывает список одним проходом.
+    pending = _get_pending()
+    users, recipes = pending.users, pending.recipes
+    if not users and not recipes:
+        return
+    pending.users, pending.recipes = defaultdict(set), defaultdict(set)
+    recipe_ids = set().union(*users.values())
+    ingredients = defaultdict(set)
+    for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe__in=recipe_ids).values_list('recipe', 'ingredient'):
+        ingredients[recipe_id].add(ingredient_id)
+    for user_id, changed in users.items():
+        if all(recipe_id in ingredients for recipe_id in changed):
+            scope = set().union(*(ingredients[pk] for pk in changed))
+        else:
+            # Рецепт удалён вместе с ингредиентами: пересчитываем весь список.
+            scope = None
+        refresh_shopping_lists([user_id], scope)
+    for recipe_id, ingredient_ids in recipes.items():
+        refresh_shopping_lists(
+            ShoppingCart.objects.filter(recipe=recipe_id)
+            .values_list('user', flat=True),
+            ingredient_ids
+        )
@@ -0,0 +1,174 @@
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from scipy import sparse
+
+from recipes.constants import (SIMILAR_BLOCK_SIZE, SIMILAR_LOAD_CHUNK,
+                               SIMILAR_RECIPES_COUNT, SIMILAR_TAG_WEIGHT)
+from recipes.models import Recipe, RecipeIngredient, RecipeNeighbour, RecipeTag
+
+
+def load_pairs(queryset, field):
+    pairs = np.array(
+        list(queryset.values_list('recipe', field).order_by().iterator(
+            chunk_size=SIMILAR_LOAD_CHUNK
+        )),
+        dtype=np.int64
+    )
+    return pairs.reshape(-1, 2)
+
+
+def build_matrix():
+    # Строки — рецепты, столбцы — ингредиенты и теги. Вес признака
+    # TF-IDF: редкий ингредиент говорит о сходстве больше, чем соль.
+    # Строки нормированы, поэтому косинус — это скалярное произведение.
+    recipe_ids = np.array(
+        list(Recipe.objects.order_by('id').values_list('id', flat=True)),
+        dtype=np.int64
+    )
+    ingredients = load_pairs(RecipeIngredient.objects, 'ingredient')
+    tags = load_pairs(RecipeTag.objects, 'tag')
+    ingredient_ids, ingredient_columns = np.unique(
+        ingredients[:, 1], return_inverse=True
+    )
+    _, tag_columns = np.unique(tags[:, 1], return_inverse=True)
+    pairs = np.concatenate((ingredients[:, 0], tags[:, 0]))
+    rows = np.searchsorted(recipe_ids, pairs)
+    # Рецепт мог быть удалён между запросами.
+    known = (rows < len(recipe_ids)) & (
+        recipe_ids[np.minimum(rows, len(recipe_ids) - 1)] == pairs
+    )
+    columns = np.concatenate((
+        ingredient_columns, tag_columns + len(ingredient_ids)
+    ))
+    weights = np.concatenate((
+        np.ones(len(ingredient_columns), dtype=np.float32),
+        np.full(len(tag_columns), SIMILAR_TAG_WEIGHT, dtype=np.float32),
+    ))
+    rows, columns, weights = rows[known], columns[known], weights[known]
+    features = len(ingredient_ids) + tag_columns.max(initial=-1) + 1
+    documents = np.bincount(columns, minlength=features)
+    idf = np.log((1 + len(recipe_ids)) / (1 + documents)) + 1
+    matrix = sparse.csr_matrix(
+        (weights * idf[columns].astype(np.float32), (rows, columns)),
+        shape=(len(recipe_ids), features), dtype=np.float32
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return recipe_ids, sparse.diags(1 / norms).dot(matrix).tocsr()
+
+
+def similarity_blocks(matrix, positions, block_size=SIMILAR_BLOCK_SIZE):
+    # Плотная матрица сходства считается блоками строк: памяти нужно
+    # block_size × число рецептов, а не квадрат каталога.
+    transposed = matrix.T.tocsr()
+    for start in range(0, len(positions), block_size):
+        block = positions[start:start + block_size]
+        scores = matrix[block].dot(transposed).toarray()
+        scores[np.arange(len(block)), block] = 0
+        yield block, scores
+
+
+def top_neighbours(scores, count):
+    if count < scores.shape[1]:
+        top = np.argpartition(-scores, count, axis=1)[:, :count]
+    else:
+        top = np.broadcast_to(
+            np.arange(scores.shape[1]), scores.shape
+        ).copy()
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    return (
+        np.take_along_axis(top, order, axis=1),
+        np.take_along_axis(top_scores, order, axis=1),
+    )
+
+
+def get_thresholds(recipe_ids, count):
+    # Минимальное сходство в текущем списке соседей: изменённый рецепт
+    # попадает в чужой список, только если превзойдёт его.
+    thresholds = np.zeros(len(recipe_ids), dtype=np.float32)
+    for recipe_id, weakest, total in (
+            RecipeNeighbour.objects.values('recipe')
+            .annotate(weakest=Min('score'), total=Count('id'))
+            .values_list('recipe', 'weakest', 'total').order_by()):
+        position = np.searchsorted(recipe_ids, recipe_id)
+        if total >= count and position < len(recipe_ids) and (
+                recipe_ids[position] == recipe_id):
+            thresholds[position] = weakest
+    return thresholds
+
+
+def positions_of(recipe_ids, ids):
+    ids = np.array(sorted(ids), dtype=np.int64)
+    positions = np.searchsorted(recipe_ids, ids)
+    positions = positions[positions < len(recipe_ids)]
+    return positions[recipe_ids[positions] == ids[:len(positions)]]
+
+
+def find_affected(matrix, recipe_ids, dirty, count, block_size):
+    changed = positions_of(recipe_ids, dirty.values_list('id', flat=True))
+    affected = set(changed.tolist())
+    stale = RecipeNeighbour.objects.filter(
+        neighbour__in=dirty.values('id')
+    ).values_list('recipe', flat=True).distinct()
+    affected.update(positions_of(recipe_ids, stale).tolist())
+    thresholds = get_thresholds(recipe_ids, count)
+    for _, scores in similarity_blocks(matrix, changed, block_size):
+        affected.update(
+            np.flatnonzero((scores > thresholds).any(axis=0)).tolist()
+        )
+    return np.array(sorted(affected), dtype=np.int64)
+
+
+def write_neighbours(recipe_ids, block, neighbours, scores):
+    with transaction.atomic():
+        RecipeNeighbour.objects.filter(recipe__in=recipe_ids[block]).delete()
+        RecipeNeighbour.objects.bulk_create([
+            RecipeNeighbour(
+                recipe_id=int(recipe_ids[position]),
+                neighbour_id=int(recipe_ids[neighbour]),
+                score=round(float(score), 6)
+            )
+            for position, row, row_scores in zip(block, neighbours, scores)
+            for neighbour, score in zip(row, row_scores)
+            if score > 0
+        ])
+
+
+def refresh_neighbours(full=False, count=SIMILAR_RECIPES_COUNT,
+                       block_size=SIMILAR_BLOCK_SIZE, log=None):
+    # Без full пересчитываются рецепты, созданные или изменённые после
+    # прошлого расчёта, и те, чьи списки соседей они затрагивают. Веса
+    # IDF при этом у остальных не обновляются, поэтому полный расчёт
+    # стоит время от времени повторять.
+    log = log or (lambda message: None)
+    started = timezone.now()
+    recipe_ids, matrix = build_matrix()
+    dirty = Recipe.objects.all()
+    if not full:
+        dirty = dirty.filter(
+            Q(neighbours_updated__isnull=True)
+            | Q(updated__gt=F('neighbours_updated'))
+        )
+    changed = dirty.count()
+    # Когда изменена большая часть каталога, выборочный пересчёт
+    # обходится дороже полного.
+    if full or changed * 2 >= len(recipe_ids):
+        positions = np.arange(len(recipe_ids))
+    elif changed:
+        positions = find_affected(
+            matrix, recipe_ids, dirty, count, block_size
+        )
+    else:
+        positions = np.array([], dtype=np.int64)
+    done = 0
+    for block, scores in similarity_blocks(matrix, positions, block_size):
+        neighbours, top_scores = top_neighbours(scores, count)
+        write_neighbours(recipe_ids, block, neighbours, top_scores)
+        done += len(block)
+        log(f'Похожие рецепты: {done} из {len(positions)}')
+    # Рецепт, изменённый во время расчёта, останется в очереди.
+    dirty.filter(updated__lte=started).update(neighbours_updated=started)
+    return changed, len(positions)
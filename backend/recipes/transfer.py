@@ -0,0 +1,197 @@
+import json
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from backend.invalidation import invalidate
+from recipes.constants import TRANSFER_BATCH_SIZE
+from recipes.feed import recipe_published
+from recipes.models import Ingredient, Recipe, RecipeIngredient, RecipeTag, Tag
+
+User = get_user_model()
+
+RECIPE_FIELDS = (
+    'id', 'short_link', 'name', 'text', 'cooking_time', 'image', 'pub_date',
+    'author__email', 'author__username', 'author__first_name',
+    'author__last_name',
+)
+
+
+def export_recipes(batch_size=TRANSFER_BATCH_SIZE):
+    # Рецепты читаются пачками по возрастанию id, поэтому в памяти
+    # никогда не больше одной пачки, а порядок строк в файле стабилен.
+    last_id = 0
+    while True:
+        rows = list(
+            Recipe.objects.filter(pk__gt=last_id).order_by('pk')
+            .values(*RECIPE_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return
+        last_id = rows[-1]['id']
+        recipe_ids = [row['id'] for row in rows]
+        tags = defaultdict(list)
+        for recipe_id, slug, name in (
+                RecipeTag.objects.filter(recipe__in=recipe_ids)
+                .values_list('recipe', 'tag__slug', 'tag__name')
+                .order_by('tag__slug')):
+            tags[recipe_id].append({'slug': slug, 'name': name})
+        ingredients = defaultdict(list)
+        for recipe_id, name, unit, amount in (
+                RecipeIngredient.objects.filter(recipe__in=recipe_ids)
+                .values_list(
+                    'recipe', 'ingredient__name',
+                    'ingredient__measurement_unit', 'amount'
+                ).order_by('id')):
+            ingredients[recipe_id].append(
+                {'name': name, 'measurement_unit': unit, 'amount': amount}
+            )
+        for row in rows:
+            yield {
+                'id': row['id'],
+                'short_link': row['short_link'],
+                'name': row['name'],
+                'text': row['text'],
+                'cooking_time': row['cooking_time'],
+                'image': row['image'],
+                'pub_date': row['pub_date'].isoformat(),
+                'author': {
+                    'email': row['author__email'],
+                    'username': row['author__username'],
+                    'first_name': row['author__first_name'],
+                    'last_name': row['author__last_name'],
+                },
+                'tags': tags[row['id']],
+                'ingredients': ingredients[row['id']],
+            }
+
+
+def dump_record(record):
+    return json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def read_records(lines, start=0):
+    for number, line in enumerate(lines, 1):
+        if number <= start or not line.strip():
+            continue
+        yield number, json.loads(line)
+
+
+def get_authors(records):
+    authors = {record['author']['email']: record['author']
+               for record in records}
+    existing = dict(
+        User.objects.filter(email__in=authors).values_list('email', 'id')
+    )
+    missing = [
+        User(**author) for email, author in authors.items()
+        if email not in existing
+    ]
+    for user in missing:
+        user.set_unusable_password()
+    User.objects.bulk_create(missing, ignore_conflicts=True)
+    existing = dict(
+        User.objects.filter(email__in=authors).values_list('email', 'id')
+    )
+    conflicts = sorted(authors.keys() - existing.keys())
+    if conflicts:
+        raise ValueError(
+            'Не удалось создать авторов (логин занят?): '
+            + ', '.join(conflicts)
+        )
+    return existing
+
+
+def get_tags(records):
+    tags = {tag['slug']: tag for record in records for tag in record['tags']}
+    Tag.objects.bulk_create(
+        [Tag(**tag) for tag in tags.values()], ignore_conflicts=True
+    )
+    return dict(
+        Tag.objects.filter(slug__in=tags).values_list('slug', 'id')
+    )
+
+
+def get_ingredients(records):
+    ingredients = {
+        ingredient['name']: ingredient['measurement_unit']
+        for record in records for ingredient in record['ingredients']
+    }
+    Ingredient.objects.bulk_create(
+        [Ingredient(name=name, measurement_unit=unit)
+         for name, unit in ingredients.items()],
+        ignore_conflicts=True
+    )
+    return dict(
+        Ingredient.objects.filter(name__in=ingredients)
+        .values_list('name', 'id')
+    )
+
+
+def import_batch(records):
+    # Рецепт сопоставляется по short_link: уже перенесённые строки
+    # пропускаются, поэтому повторный запуск с любого места безопасен.
+    # Возвращает соответствие id источника и id в этой базе.
+    for record in records:
+        if not record.get('short_link'):
+            record['short_link'] = Recipe().generate_short_link()
+    links = [record['short_link'] for record in records]
+    existing = dict(
+        Recipe.objects.filter(short_link__in=links)
+        .values_list('short_link', 'id')
+    )
+    new = [
+        record for record in records
+        if record['short_link'] not in existing
+    ]
+    if new:
+        with transaction.atomic():
+            authors = get_authors(new)
+            tags = get_tags(new)
+            ingredients = get_ingredients(new)
+            Recipe.objects.bulk_create([
+                Recipe(
+                    author_id=authors[record['author']['email']],
+                    short_link=record['short_link'],
+                    name=record['name'],
+                    text=record['text'],
+                    cooking_time=record['cooking_time'],
+                    image=record['image'],
+                    pub_date=parse_datetime(record['pub_date']),
+                )
+                for record in new
+            ])
+            created = dict(
+                Recipe.objects.filter(
+                    short_link__in=[record['short_link'] for record in new]
+                ).values_list('short_link', 'id')
+            )
+            RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(
+                    recipe_id=created[record['short_link']],
+                    ingredient_id=ingredients[ingredient['name']],
+                    amount=ingredient['amount']
+                )
+                for record in new for ingredient in record['ingredients']
+            ])
+            RecipeTag.objects.bulk_create([
+                RecipeTag(
+                    recipe_id=created[record['short_link']],
+                    tag_id=tags[tag['slug']]
+                )
+                for record in new for tag in record['tags']
+            ])
+            # bulk_create не отправляет post_save, раскладку по лентам
+            # подписчиков и сброс кешей каталога ставим явно.
+            for record in new:
+                recipe_published(
+                    created[record['short_link']],
+                    authors[record['author']['email']], notify=False
+                )
+            invalidate('catalog', 'recipes')
+        existing.update(created)
+    return {
+        record['id']: existing[record['short_link']] for record in records
+    }, len(new)
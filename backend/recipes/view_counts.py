@@ -0,0 +1,108 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.db import DatabaseError, close_old_connections
+from django.db.models import Case, F, Value, When
+
+from recipes.constants import (VIEW_DEDUP_WINDOW, VIEW_FLUSH_BATCH,
+                               VIEW_FLUSH_INTERVAL, VIEW_SEEN_MAX_ENTRIES)
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+_counts = Counter()
+# Отметка просмотра -> когда истекает окно, по давности использования.
+_seen = OrderedDict()
+_lock = threading.Lock()
+_flusher = None
+
+
+def record_view(recipe_id, viewer):
+    # Повторный просмотр того же рецепта тем же зрителем в пределах окна
+    # не считается. Окно помнит сам процесс, без обращения к кешу или
+    # базе: повтор, пришедший в другой воркер, засчитается ещё раз, но
+    # не больше раза на воркер. Счётчик увеличивается в памяти, в базу
+    # его пишет фоновый поток процесса.
+    key = (recipe_id, viewer)
+    now = time.monotonic()
+    with _lock:
+        if _seen.get(key, 0) > now:
+            _seen.move_to_end(key)
+            return
+        _seen[key] = now + VIEW_DEDUP_WINDOW
+        _seen.move_to_end(key)
+        while len(_seen) > VIEW_SEEN_MAX_ENTRIES:
+            _seen.popitem(last=False)
+        _counts[recipe_id] += 1
+    start_flusher()
+
+
+def start_flusher():
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _lock:
+        if _flusher is not None and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(
+            target=run_flusher, name='recipe-views', daemon=True
+        )
+        _flusher.start()
+
+
+def run_flusher():
+    stopped = threading.Event()
+    while not stopped.wait(VIEW_FLUSH_INTERVAL):
+        try:
+            flush()
+        finally:
+            close_old_connections()
+
+
+def flush(log_errors=True):
+    with _lock:
+        counts = dict(_counts)
+        _counts.clear()
+    if not counts:
+        return 0
+    # id отсортированы, чтобы воркеры блокировали строки в одном порядке.
+    recipe_ids = sorted(counts)
+    try:
+        for start in range(0, len(recipe_ids), VIEW_FLUSH_BATCH):
+            batch = recipe_ids[start:start + VIEW_FLUSH_BATCH]
+            Recipe.objects.filter(pk__in=batch).update(views=F('views') + Case(
+                *(When(pk=recipe_id, then=Value(counts[recipe_id]))
+                  for recipe_id in batch)
+            ))
+            for recipe_id in batch:
+                del counts[recipe_id]
+    except DatabaseError:
+        if log_errors:
+            logger.exception('Не удалось записать просмотры рецептов')
+        # Незаписанные просмотры вернутся в счётчик до следующей попытки.
+        with _lock:
+            _counts.update(counts)
+        return 0
+    return len(recipe_ids)
+
+
+def flush_at_exit():
+    # К выходу интерпретатора базы может уже не быть, например тестовую
+    # удалили раньше: писать некуда, и трассировка ничего не сообщит.
+    flush(log_errors=False)
+
+
+def reset_after_fork():
+    # Поток и несохранённые счётчики мастера воркеру не достаются.
+    global _flusher, _lock
+    _lock = threading.Lock()
+    _counts.clear()
+    _flusher = None
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+atexit.register(flush_at_exit)
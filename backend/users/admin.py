@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework.authtoken.models import TokenProxy
 
+from recipes.models import Recipe
 from users.models import Follow
 
 User = get_user_model()
@@ -14,20 +17,45 @@ class UserAdmin(admin.ModelAdmin):
         'username', 'email', 'first_name',
         'last_name', 'followers', 'recipes',
     )
-    list_filter = ('username', 'email',)
-    search_fields = ('username', 'email', 'first_name', 'last_name')
+    list_filter = ('is_staff', 'is_active',)
+    # Поиск по префиксу логина и точной почте: оба поля уникальны
+    # и проиндексированы, LIKE '%...%' по всей таблице не выполняется.
+    search_fields = ('^username', '=email')
+    ordering = ('id',)
+    show_full_result_count = False
 
-    @admin.display(description='Количество подписчиков')
+    def get_queryset(self, request):
+        # Счётчики считаются коррелированными подзапросами только для
+        # строк текущей страницы, а не через JOIN и GROUP BY по всей таблице.
+        return super().get_queryset(request).annotate(
+            followers_count=Coalesce(Subquery(
+                Follow.objects.filter(following=OuterRef('pk')).order_by()
+                .values('following').annotate(count=Count('id'))
+                .values('count')
+            ), 0),
+            recipes_count=Coalesce(Subquery(
+                Recipe.objects.filter(author=OuterRef('pk')).order_by()
+                .values('author').annotate(count=Count('id'))
+                .values('count')
+            ), 0),
+        )
+
+    @admin.display(
+        description='Количество подписчиков', ordering='followers_count'
+    )
     def followers(self, obj):
-        return obj.following.count()
+        return obj.followers_count
 
-    @admin.display(description='Количество рецептов')
+    @admin.display(description='Количество рецептов', ordering='recipes_count')
     def recipes(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
 class FollowAdmin(admin.ModelAdmin):
     list_display = ("user", "following",)
+    list_select_related = ('user', 'following',)
+    raw_id_fields = ('user', 'following',)
+    show_full_result_count = False
 
 
 admin.site.register(User, UserAdmin)